@@ -0,0 +1,132 @@
+""" Alphabet
+
+Decides which slot of an InfiniteHashTable each character of a key goes to.
+An alphabet of size S gives tables of S + 1 slots: one per character slot,
+and a last one for keys that end at that level.
+
+Characters that share a slot push keys that differ only there a level
+deeper, so an alphabet covering every character of the keys keeps tables
+shallow, at the cost of larger tables.
+"""
+from __future__ import annotations
+
+__docformat__ = 'reStructuredText'
+
+
+class Alphabet:
+    """
+    Alphabet of the characters from `first` on, one slot each, wrapping
+    around: a character goes to slot (ord(char) - first) % size.
+
+    `sorted_slots` lists the slots in character order, starting with the
+    slot for keys that end. `start` is the character the order starts from,
+    and the `size` characters from it are the ones that order keys.
+    """
+
+    __slots__ = ("name", "size", "first", "start", "sorted_slots")
+
+    def __init__(self, name: str, size: int, first: int = 0, start: int | None = None) -> None:
+        """
+        :param name: Name, for reports.
+        :param size: Number of character slots.
+        :param first: Code point of the character in slot 0.
+        :param start: Code point of the first character in sorted order,
+            by default `first`.
+        :raises ValueError: When the size is not positive.
+        """
+        if size <= 0:
+            raise ValueError("Alphabet needs at least one slot.")
+        self.name = name
+        self.size = size
+        self.first = first
+        start = first if start is None else start
+        self.start = start
+        self.sorted_slots = [size] + [(start - first + i) % size for i in range(size)]
+
+    def slot(self, char: str) -> int:
+        """
+        Slot for this character.
+        """
+        return (ord(char) - self.first) % self.size
+
+    def check(self, key: str) -> None:
+        """
+        Every character has a slot, so there is nothing to check.
+        """
+
+    def orders(self, char: str) -> bool:
+        """
+        Whether this character has a slot of its own, placed in character
+        order by sorted_slots, so walking the slots orders keys by it.
+        """
+        return 0 <= ord(char) - self.start < self.size
+
+
+class MappedAlphabet(Alphabet):
+    """
+    Alphabet from a caller-supplied character -> slot map. Characters
+    without a slot are rejected. Several characters may share a slot, but
+    then do not order keys.
+    """
+
+    __slots__ = ("slots", "sharing")
+
+    def __init__(self, name: str, slots: dict[str, int]) -> None:
+        """
+        :param name: Name, for reports.
+        :param slots: Slot of each character, from 0 up.
+        :raises ValueError: When there are no characters, or a slot is negative.
+        """
+        if len(slots) == 0 or min(slots.values()) < 0:
+            raise ValueError("Alphabet needs characters with slots from 0 up.")
+        Alphabet.__init__(self, name, max(slots.values()) + 1)
+        self.slots = dict(slots)
+        # Number of characters in each slot.
+        self.sharing = {}
+        for slot in slots.values():
+            self.sharing[slot] = self.sharing.get(slot, 0) + 1
+        # In order of each slot's smallest character.
+        self.sorted_slots = [self.size]
+        for char in sorted(slots):
+            if slots[char] not in self.sorted_slots:
+                self.sorted_slots.append(slots[char])
+
+    @classmethod
+    def from_characters(cls, name: str, characters: str) -> MappedAlphabet:
+        """
+        Alphabet giving each of these characters its own slot.
+        """
+        return cls(name, {char: i for i, char in enumerate(dict.fromkeys(characters))})
+
+    def slot(self, char: str) -> int:
+        """
+        Slot for this character.
+
+        :raises ValueError: When the character has no slot.
+        """
+        try:
+            return self.slots[char]
+        except KeyError:
+            raise ValueError(f"{char!r} is not in alphabet {self.name}.") from None
+
+    def check(self, key: str) -> None:
+        """
+        :raises ValueError: When a character of key has no slot.
+        :complexity: O(len(key))
+        """
+        for char in key:
+            self.slot(char)
+
+    def orders(self, char: str) -> bool:
+        """
+        Whether this character has a slot of its own.
+        """
+        return char in self.slots and self.sharing[self.slots[char]] == 1
+
+
+# ord(char) % 26, which suits lowercase keys ("a" is 97 % 26 = 19).
+LOWERCASE = Alphabet("lowercase", 26, start=ord("a"))
+# Every ASCII character from space to ~.
+PRINTABLE = Alphabet("printable", 95, first=ord(" "))
+# Every character up to 255 (and beyond, wrapping around).
+BYTE = Alphabet("byte", 256)
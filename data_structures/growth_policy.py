@@ -0,0 +1,106 @@
+""" Growth Policy
+
+Decides which sizes a hash table grows through, and at what load it should grow.
+"""
+from __future__ import annotations
+
+__docformat__ = 'reStructuredText'
+
+
+def is_prime(n: int) -> bool:
+    """
+    Checks whether n is prime by trial division.
+
+    :complexity: O(sqrt(n))
+    """
+    if n < 2:
+        return False
+    if n < 4:
+        return True
+    if n % 2 == 0 or n % 3 == 0:
+        return False
+    divisor = 5
+    while divisor * divisor <= n:
+        if n % divisor == 0 or n % (divisor + 2) == 0:
+            return False
+        divisor += 6
+    return True
+
+
+def next_prime(n: int) -> int:
+    """
+    Returns the smallest prime greater than or equal to n.
+
+    :complexity: O(G * sqrt(n)) where G is the gap to the next prime.
+    """
+    while not is_prime(n):
+        n += 1
+    return n
+
+
+class GrowthPolicy:
+    """
+    Growth Policy.
+
+    Tables grow through the given sizes first. Past the last one, an unbounded
+    policy keeps growing to the next prime at least growth_factor times the
+    previous size, while a bounded policy stops growing.
+
+    A policy holds no per-table state, so one can be shared between tables.
+    """
+
+    def __init__(self, sizes: list[int], growth_factor: float = 2.0, max_load_factor: float = 0.5, bounded: bool = False) -> None:
+        """
+        :param sizes: Sizes to grow through first.
+        :param growth_factor: How much larger each size past the given ones is.
+        :param max_load_factor: Ratio of entries to table size at which to grow.
+        :param bounded: Whether to stop growing past the given sizes.
+        :raises ValueError: When there are no sizes, the growth factor is not
+            greater than 1 or the load factor is not between 0 and 1.
+        """
+        if len(sizes) == 0:
+            raise ValueError("Growth policy needs at least one size.")
+        if growth_factor <= 1:
+            raise ValueError("Growth factor should be greater than 1.")
+        if not 0 < max_load_factor < 1:
+            raise ValueError("Max load factor should be between 0 and 1.")
+        # Copied, as unbounded policies extend it.
+        self.sizes = list(sizes)
+        self.growth_factor = growth_factor
+        self.max_load_factor = max_load_factor
+        self.bounded = bounded
+
+    def size_at(self, index: int) -> int | None:
+        """
+        Returns the size at this step of growth, or None if a bounded policy
+        cannot grow that far.
+
+        :complexity: O(1) for sizes already generated, otherwise see next_prime.
+        """
+        if self.bounded and index >= len(self.sizes):
+            return None
+        while index >= len(self.sizes):
+            self.sizes.append(next_prime(int(self.sizes[-1] * self.growth_factor) + 1))
+        return self.sizes[index]
+
+    def load_limit(self, size: int) -> float:
+        """
+        Number of entries a table of this size holds before it should grow.
+        """
+        return size * self.max_load_factor
+
+    def index_for(self, count: int) -> int:
+        """
+        Returns the first step of growth whose size holds count entries without
+        growing. A bounded policy returns its last step if none does.
+
+        :complexity: O(S) where S is the number of steps up to the result.
+        """
+        index = 0
+        size = self.size_at(index)
+        while count > self.load_limit(size):
+            if self.size_at(index + 1) is None:
+                break
+            index += 1
+            size = self.size_at(index)
+        return index
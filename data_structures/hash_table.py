@@ -3,12 +3,18 @@
 Defines a Hash Table using Linear Probing for conflict resolution.
 """
 from __future__ import annotations
+import copy
+import time
 __author__ = 'Jackson Goerner'
 __since__ = '07/02/2023'
 
 
-from typing import TypeVar, Generic
+from typing import TypeVar, Generic, Iterable, Iterator
 from data_structures.referential_array import ArrayR
+from data_structures.growth_policy import GrowthPolicy
+from data_structures.probing import ProbeSequence, LinearProbing, QuadraticProbing, LINEAR
+from data_structures.table_stats import TableStats, longest_cluster
+from data_structures import key_hashing
 
 K = TypeVar('K')
 V = TypeVar('V')
@@ -16,33 +22,139 @@ V = TypeVar('V')
 class FullError(Exception):
     pass
 
+# Stored in place of a hash to mark a slot whose key was deleted.
+TOMBSTONE = object()
+
 
 class LinearProbeTable(Generic[K, V]):
     """
     Linear Probe Table.
 
     Type Arguments:
-        - K:    Key Type. In most cases should be string.
-                Otherwise `hash` should be overwritten.
+        - K:    Key Type. Strings, integers and tuples of those are hashed
+                natively. Otherwise `full_hash` should be overwritten.
         - V:    Value Type.
 
+    The probe sequence is linear by default, and can be swapped for
+    quadratic probing or double hashing (see data_structures.probing).
+    Those always delete with tombstones, as moving keys back into a gap
+    only works along a linear sequence.
+
+    Robin Hood mode keeps each cluster ordered by initial position: an insert
+    displaces any key that sits closer to its own initial position. This
+    bounds the variance of probe lengths, and lets a search for a missing key
+    stop as soon as it passes such a key.
+
+    Tombstone mode deletes by marking the slot instead of reinserting the
+    rest of the cluster. Inserts reuse marked slots, and the table is
+    compacted once the ratio of marked slots crosses a threshold.
+
+    Incremental mode resizes without moving everything at once: the old
+    arrays are kept alongside the new ones, and each get/set/delete migrates
+    the next few slots across. Lookups check both until migration finishes.
+
+    The columnar layout stores keys and values in parallel arrays
+    (`key_array`, `value_array`) instead of (key, value) tuples in `array`,
+    so overwriting a value allocates nothing. Either way `hashes` holds the
+    stored hash of each slot, None for an empty slot or TOMBSTONE.
+
+    Iterating with iter_keys/iter_values/iter_items (or over the table
+    itself) streams entries without building a list, and raises
+    RuntimeError if keys are added or removed along the way.
+
+    With stats enabled, probe lengths and resizes are recorded for stats().
+    Otherwise recording costs one None check per probe.
+
     Unless stated otherwise, all methods have O(1) complexity.
     """
 
-    # No test case should exceed 1 million entries.
+    # Attributes live in slots. __dict__ is kept (but only allocated when
+    # used) so that `hash` can still be overwritten on an instance.
+    __slots__ = (
+        "policy", "size_index", "count", "robin_hood", "tombstones", "tombstone_count",
+        "compaction_threshold", "incremental", "migration_step", "columnar", "probing",
+        "array", "key_array", "value_array", "hashes",
+        "_stats", "_modifications", "_retired", "_migrate_position", "__dict__",
+    )
+
+    # Past these, the default growth policy generates larger primes.
     TABLE_SIZES = [5, 13, 29, 53, 97, 193, 389, 769, 1543, 3079, 6151, 12289, 24593, 49157, 98317, 196613, 393241, 786433, 1572869]
 
-    HASH_BASE = 31
+    HASH_BASE = key_hashing.HASH_BASE
+    HASH_MODULUS = key_hashing.HASH_MODULUS
 
-    def __init__(self, sizes=None) -> None:
+    def __init__(self, sizes=None, robin_hood: bool = False, tombstones: bool = False, compaction_threshold: float = 0.25, expected_size: int = 0, policy: GrowthPolicy | None = None, incremental: bool = False, migration_step: int = 4, columnar: bool = False, probing: ProbeSequence = LINEAR, stats: bool | TableStats | None = False) -> None:
         """
         Initialise the Hash Table.
+
+        :param sizes: Table sizes to resize through, the table stops growing past them.
+        :param policy: Growth policy to use instead of sizes. Defaults to
+            growing through TABLE_SIZES and on to larger primes.
+        :param expected_size: Number of entries to size the table for up front,
+            so that inserting them never rehashes.
+        :param robin_hood: Whether to use Robin Hood displacement when probing.
+        :param tombstones: Whether deletes leave tombstones behind.
+        :param compaction_threshold: Ratio of tombstones to table size past which
+            the table is compacted.
+        :param incremental: Whether to migrate to a larger table a few slots at a time.
+        :param migration_step: Number of slots to migrate per operation.
+        :param columnar: Whether to store keys and values in parallel arrays.
+        :param probing: Probe sequence to use.
+        :param stats: Whether to record stats, or a TableStats to record into
+            (shared with other tables).
+        :raises ValueError: When combining Robin Hood with tombstones or with a
+            non-linear probe sequence, when tombstones and entries could
+            fill the table (with tombstones), when quadratic probing could not reach a free
+            slot, or when the migration step is not positive.
         """
-        if sizes is not None:
-            self.TABLE_SIZES = sizes
-        self.size_index = 0
-        self.array:ArrayR[tuple[K, V]] = ArrayR(self.TABLE_SIZES[self.size_index])
+        if policy is None:
+            policy = GrowthPolicy(self.TABLE_SIZES if sizes is None else sizes, bounded=sizes is not None)
+        if robin_hood and not isinstance(probing, LinearProbing):
+            raise ValueError("Robin Hood displacement needs linear probing.")
+        if not isinstance(probing, LinearProbing):
+            tombstones = True
+        if robin_hood and tombstones:
+            raise ValueError("Robin Hood deletes are already O(cluster), tombstones are not supported.")
+        if isinstance(probing, QuadraticProbing) and policy.max_load_factor > 0.5:
+            raise ValueError("Quadratic probing only reaches half of the table, max load factor should be at most 0.5.")
+        if tombstones and (compaction_threshold <= 0 or policy.max_load_factor + compaction_threshold >= 1):
+            raise ValueError("Compaction threshold should be positive, and leave room for empty slots.")
+        if migration_step < 1:
+            raise ValueError("Migration step should be positive.")
+        self.policy = policy
+        if stats is True:
+            stats = TableStats()
+        self._stats:TableStats | None = stats or None
+        self.probing = probing
+        self.robin_hood = robin_hood
+        self.tombstones = tombstones
+        self.compaction_threshold = compaction_threshold
+        self.columnar = columnar
+        self.size_index = self.policy.index_for(expected_size)
+        self._allocate(self.policy.size_at(self.size_index))
         self.count = 0
+        # Bumped whenever keys are added, removed or moved, to catch changes mid-iteration.
+        self._modifications = 0
+        self.incremental = incremental
+        self.migration_step = migration_step
+        # While migrating: the table holding the old arrays, and the next slot to move.
+        self._retired:LinearProbeTable[K, V] | None = None
+        self._migrate_position = 0
+
+    def _allocate(self, size: int) -> None:
+        """
+        Switch to fresh, empty arrays of the given size.
+
+        :complexity: O(size)
+        """
+        if self.columnar:
+            self.key_array:ArrayR[K] = ArrayR(size)
+            self.value_array:ArrayR[V] = ArrayR(size)
+        else:
+            self.array:ArrayR[tuple[K, V]] = ArrayR(size)
+        # Hash stored alongside each slot, so resizing never rehashes a key.
+        self.hashes:ArrayR[int] = ArrayR(size)
+        self.tombstone_count = 0
 
     def hash(self, key: K) -> int:
         """
@@ -50,17 +162,51 @@ class LinearProbeTable(Generic[K, V]):
 
         :complexity: O(len(key))
         """
+        return self.full_hash(key) % self.table_size
+
+    def full_hash(self, key: K) -> int:
+        """
+        Hash a key independently of the table size.
+        Reducing this modulo the table size gives the position from `hash`.
+        Strings, integers and tuples of those are supported.
+
+        :complexity: See key_hashing.full_hash.
+        """
+        return key_hashing.full_hash(key)
+
+    def _hash_is_full(self) -> bool:
+        """
+        Whether `hash` is the default one, i.e. the stored hashes are full
+        hashes that survive a resize. An overwritten `hash` only gives a
+        position, which has to be recomputed after resizing.
+        """
+        return getattr(self.hash, "__func__", None) is LinearProbeTable.hash
+
+    def _hash_key(self, key: K) -> int:
+        """
+        Hash to store alongside a key. Reduced modulo the table size it gives the
+        key's initial position.
+
+        :complexity: O(len(key))
+        """
+        if self._hash_is_full():
+            return self.full_hash(key)
+        return self.hash(key)
 
-        value = 0
-        a = 31415
-        for char in key:
-            value = (ord(char) + a * value) % self.table_size
-            a = a * self.HASH_BASE % (self.table_size - 1)
-        return value
+    def _reserve(self, count: int) -> None:
+        """
+        Grow the table in one step, so that it holds count entries without rehashing.
+
+        :complexity: See GrowthPolicy.index_for, plus _resize if not large enough.
+        """
+        size_index = self.policy.index_for(count)
+        if size_index > self.size_index:
+            self.size_index = size_index
+            self._resize(self.policy.size_at(size_index))
 
     @property
     def table_size(self) -> int:
-        return len(self.array)
+        return len(self.hashes)
 
     def __len__(self) -> int:
         """
@@ -68,47 +214,266 @@ class LinearProbeTable(Generic[K, V]):
         """
         return self.count
 
+    def _key_at(self, position: int) -> K:
+        """
+        Key stored at a taken position.
+        """
+        if self.columnar:
+            return self.key_array[position]
+        return self.array[position][0]
+
+    def _value_at(self, position: int) -> V:
+        """
+        Value stored at a taken position.
+        """
+        if self.columnar:
+            return self.value_array[position]
+        return self.array[position][1]
+
+    def _write(self, position: int, key: K, data: V, key_hash: int) -> None:
+        """
+        Store a (key, value) pair and its hash at a position.
+        """
+        if self.columnar:
+            self.key_array[position] = key
+            self.value_array[position] = data
+        else:
+            self.array[position] = (key, data)
+        self.hashes[position] = key_hash
+
+    def _copy(self, source: LinearProbeTable[K, V], index: int, position: int, key_hash: int) -> None:
+        """
+        Copy the entry at index of source (this table, or one holding older
+        arrays in the same layout) to position, with the given hash.
+        """
+        if self.columnar:
+            self.key_array[position] = source.key_array[index]
+            self.value_array[position] = source.value_array[index]
+        else:
+            self.array[position] = source.array[index]
+        self.hashes[position] = key_hash
+
+    def _clear(self, position: int, marker: object = None) -> None:
+        """
+        Empty a position, leaving marker (None or TOMBSTONE) as its hash.
+        """
+        if self.columnar:
+            self.key_array[position] = None
+            self.value_array[position] = None
+        else:
+            self.array[position] = None
+        self.hashes[position] = marker
+
+    def _is_live(self, position: int) -> bool:
+        """
+        Whether a position holds an entry, rather than being empty or a tombstone.
+        """
+        slot_hash = self.hashes[position]
+        return slot_hash is not None and slot_hash is not TOMBSTONE
+
+    def _distance(self, position: int, key_hash: int) -> int:
+        """
+        How far the key with this hash sits from its initial position.
+        """
+        return (position - key_hash) % self.table_size
+
     def _linear_probe(self, key: K, is_insert: bool) -> int:
         """
         Find the correct position for this key in the hash table using linear probing.
+        While migrating, only the new array is searched.
+
+        Returns the key's own position. For a new key when is_insert is True,
+        it returns the position the key belongs in instead. Without Robin Hood
+        that position is free (empty or a tombstone). In Robin Hood mode it may
+        hold another key, which has to be shifted along first, so writing to
+        the position directly would overwrite a live entry. Insert through
+        __setitem__ or _insert, which do that shift.
         :complexity best: O(hash(key)) first position is empty
         :complexity worst: O(hash(key) + N*comp(K)) when we've searched the entire table
                         where N is the tablesize
         :raises KeyError: When the key is not in the table, but is_insert is False.
         :raises FullError: When a table is full and cannot be inserted.
         """
+        return self._probe(key, self._hash_key(key), is_insert)
+
+    def _probe(self, key: K, key_hash: int, is_insert: bool) -> int:
+        """
+        Probe for a key whose hash has already been computed, along the
+        table's probe sequence.
+        Slots whose stored hash differs are skipped without comparing keys.
+
+        In Robin Hood mode the search also stops at the first key closer to its
+        initial position than we are to ours, as ours cannot come after it.
+        For an insert that position is returned, still taken (see _linear_probe).
+        Tombstones are probed past, and the first one is reused for an insert.
+
+        :complexity best: O(1) first position is empty
+        :complexity worst: O(N*comp(K)) when we've searched the entire table
+                        where N is the tablesize
+        :raises KeyError: When the key is not in the table, but is_insert is False.
+        :raises FullError: When a table is full and cannot be inserted.
+        """
         # Initial position
-        position = self.hash(key) 
-        
-        for _ in range(self.table_size):
-            if self.array[position] is None:
+        position = key_hash % self.table_size
+        step, growth = self.probing.steps(key_hash, self.table_size)
+        first_tombstone = None
+
+        for distance in range(self.table_size):
+            slot_hash = self.hashes[position]
+            if slot_hash is None:
+                if self._stats is not None:
+                    self._stats.record_probe(distance + 1)
                 # Empty spot. Am I upserting or retrieving?
                 if is_insert:
-                    return position
+                    return position if first_tombstone is None else first_tombstone
                 else:
                     raise KeyError(key)
-            elif self.array[position][0] == key:
+            elif slot_hash is TOMBSTONE:
+                # Reusable, but the key may still be further along.
+                if first_tombstone is None:
+                    first_tombstone = position
+            elif slot_hash == key_hash and self._key_at(position) == key:
+                if self._stats is not None:
+                    self._stats.record_probe(distance + 1)
                 return position
-            else:
-                # Taken by something else. Time to linear probe.
-                position = (position + 1) % self.table_size
+            elif self.robin_hood and self._distance(position, slot_hash) < distance:
+                if self._stats is not None:
+                    self._stats.record_probe(distance + 1)
+                # Richer key found, ours would have displaced it.
+                if is_insert:
+                    return position
+                else:
+                    raise KeyError(key)
+            # Taken by something else. Time to probe.
+            position = (position + step) % self.table_size
+            step += growth
 
+        if self._stats is not None:
+            self._stats.record_probe(self.table_size)
         if is_insert:
+            if first_tombstone is not None:
+                return first_tombstone
             raise FullError("Table is full!")
         else:
             raise KeyError(key)
 
+    def _free_slot(self, key_hash: int) -> int:
+        """
+        Find the position for a key known not to be in the table.
+        No keys are compared, as there is nothing to match against.
+        In Robin Hood mode the position may still be taken, see _shift_cluster.
+
+        :complexity best: O(1) first position is empty
+        :complexity worst: O(N) where N is the tablesize
+        :raises FullError: When a table is full and cannot be inserted.
+        """
+        position = key_hash % self.table_size
+        step, growth = self.probing.steps(key_hash, self.table_size)
+        for distance in range(self.table_size):
+            if not self._is_live(position):
+                return position
+            if self.robin_hood and self._distance(position, self.hashes[position]) < distance:
+                return position
+            position = (position + step) % self.table_size
+            step += growth
+        raise FullError("Table is full!")
+
+    def _shift_cluster(self, position: int) -> None:
+        """
+        Free up a taken position by moving it and the rest of its cluster
+        along by one slot. Used by Robin Hood inserts, and keeps the cluster
+        ordered by initial position.
+
+        :complexity: O(C) where C is the length of the rest of the cluster.
+        :raises FullError: When there is no empty slot left to shift into.
+        """
+        end = position
+        for _ in range(self.table_size):
+            if self.hashes[end] is None:
+                break
+            end = (end + 1) % self.table_size
+        else:
+            raise FullError("Table is full!")
+        while end != position:
+            previous = (end - 1) % self.table_size
+            self._copy(self, previous, end, self.hashes[previous])
+            end = previous
+        self._clear(position)
+
+    def _place(self, source: LinearProbeTable[K, V], index: int, key_hash: int) -> None:
+        """
+        Store the entry at index of source, whose key is known not to be in the table.
+
+        :complexity: See _free_slot and _shift_cluster.
+        """
+        position = self._free_slot(key_hash)
+        if self._is_live(position):
+            self._shift_cluster(position)
+        elif self.hashes[position] is TOMBSTONE:
+            self.tombstone_count -= 1
+        self._copy(source, index, position, key_hash)
+
+    def _iter_positions(self) -> Iterator[int]:
+        """
+        Yields every taken position, finishing any migration first so that
+        entries stay put.
+
+        :complexity: O(N) where N is self.table_size, plus _finish_migration.
+        :raises RuntimeError: when keys are added or removed while iterating.
+        """
+        self._finish_migration()
+        modifications = self._modifications
+        for position in range(self.table_size):
+            if self._modifications != modifications:
+                raise RuntimeError("Hash table changed size during iteration")
+            if self._is_live(position):
+                yield position
+        if self._modifications != modifications:
+            raise RuntimeError("Hash table changed size during iteration")
+
+    def iter_keys(self) -> Iterator[K]:
+        """
+        Returns an iterator of all keys in the hash table.
+
+        :complexity: O(N) where N is self.table_size, over the whole iteration.
+        :raises RuntimeError: when keys are added or removed while iterating.
+        """
+        for position in self._iter_positions():
+            yield self._key_at(position)
+
+    def iter_values(self) -> Iterator[V]:
+        """
+        Returns an iterator of all values in the hash table.
+
+        :complexity: O(N) where N is self.table_size, over the whole iteration.
+        :raises RuntimeError: when keys are added or removed while iterating.
+        """
+        for position in self._iter_positions():
+            yield self._value_at(position)
+
+    def iter_items(self) -> Iterator[tuple[K, V]]:
+        """
+        Returns an iterator of all (key, value) pairs in the hash table.
+
+        :complexity: O(N) where N is self.table_size, over the whole iteration.
+        :raises RuntimeError: when keys are added or removed while iterating.
+        """
+        for position in self._iter_positions():
+            yield self._key_at(position), self._value_at(position)
+
+    def __iter__(self) -> Iterator[K]:
+        """
+        Iterates over the keys, see iter_keys.
+        """
+        return self.iter_keys()
+
     def keys(self) -> list[K]:
         """
         Returns all keys in the hash table.
 
         :complexity: O(N) where N is self.table_size.
         """
-        res = []
-        for x in range(self.table_size):
-            if self.array[x] is not None:
-                res.append(self.array[x][0])
-        return res
+        return list(self.iter_keys())
 
     def values(self) -> list[V]:
         """
@@ -116,11 +481,15 @@ class LinearProbeTable(Generic[K, V]):
 
         :complexity: O(N) where N is self.table_size.
         """
-        res = []
-        for x in range(self.table_size):
-            if self.array[x] is not None:
-                res.append(self.array[x][1])
-        return res
+        return list(self.iter_values())
+
+    def items(self) -> list[tuple[K, V]]:
+        """
+        Returns all (key, value) pairs in the hash table.
+
+        :complexity: O(N) where N is self.table_size.
+        """
+        return list(self.iter_items())
 
     def __contains__(self, key: K) -> bool:
         """
@@ -142,8 +511,16 @@ class LinearProbeTable(Generic[K, V]):
         :complexity: See linear probe.
         :raises KeyError: when the key doesn't exist.
         """
-        position = self._linear_probe(key, False)
-        return self.array[position][1]
+        self._step_migration()
+        key_hash = self._hash_key(key)
+        try:
+            position = self._probe(key, key_hash, False)
+        except KeyError:
+            if self._retired is None:
+                raise
+            position = self._retired._probe(key, key_hash, False)
+            return self._retired._value_at(position)
+        return self._value_at(position)
 
     def __setitem__(self, key: K, data: V) -> None:
         """
@@ -152,38 +529,135 @@ class LinearProbeTable(Generic[K, V]):
         :complexity: See linear probe.
         :raises FullError: when the table cannot be resized further.
         """
+        self._step_migration()
+        self._insert(key, data)
+        if len(self) > self.policy.load_limit(self.table_size):
+            self._rehash()
 
-        position = self._linear_probe(key, True)
+    def update(self, pairs: Iterable[tuple[K, V]]) -> None:
+        """
+        Set many (key, value) pairs at once.
+        The table is grown once up front, and never rehashed along the way.
 
-        if self.array[position] is None:
-            self.count += 1
+        :complexity: O(T + M * linear probe) where T is the new table size
+                     and M is the number of pairs.
+        :raises FullError: when the table cannot be resized further.
+        """
+        if not isinstance(pairs, (list, tuple)):
+            # Need the count before inserting.
+            pairs = list(pairs)
+        self._reserve(len(self) + len(pairs))
+        for key, data in pairs:
+            self._insert(key, data)
+        if len(self) > self.policy.load_limit(self.table_size):
+            self._rehash()
 
-        self.array[position] = (key, data)
+    def _insert(self, key: K, data: V) -> None:
+        """
+        Set an (key, value) pair without checking whether to rehash.
 
-        if len(self) > self.table_size / 2:
-            self._rehash()
+        :complexity: See linear probe.
+        :raises FullError: when the table is full.
+        """
+        key_hash = self._hash_key(key)
+        position = self._probe(key, key_hash, True)
+        found = self._is_live(position) and self.hashes[position] == key_hash and self._key_at(position) == key
+
+        if not found and self._retired is not None:
+            try:
+                retired_position = self._retired._probe(key, key_hash, False)
+            except KeyError:
+                pass
+            else:
+                # Not migrated yet, update it where it is.
+                self._retired._write(retired_position, key, data, key_hash)
+                return
+
+        if found:
+            if self.columnar:
+                # Nothing to allocate, just swap the value.
+                self.value_array[position] = data
+                return
+        elif self._is_live(position):
+            # Robin Hood: displace the richer key and the rest of its cluster.
+            self._shift_cluster(position)
+            self.count += 1
+            self._modifications += 1
+        else:
+            if self.hashes[position] is TOMBSTONE:
+                self.tombstone_count -= 1
+            self.count += 1
+            self._modifications += 1
+
+        self._write(position, key, data, key_hash)
 
     def __delitem__(self, key: K) -> None:
         """
         Deletes a (key, value) pair in our hash table.
 
         :complexity best: O(hash(key)) deleting item is not probed and in correct spot.
-        :complexity worst: O(N*hash(key)+N^2*comp(K)) deleting item is midway through large chain.
+        :complexity worst: O(hash(key) + N*comp(K)) deleting item is midway through large chain,
+                        plus an O(N) compaction once in a while for tombstones.
         :raises KeyError: when the key doesn't exist.
         """
-        position = self._linear_probe(key, False)
-        # Remove the element
-        self.array[position] = None
+        self._step_migration()
+        key_hash = self._hash_key(key)
+        try:
+            position = self._probe(key, key_hash, False)
+        except KeyError:
+            if self._retired is None:
+                raise
+            # Not migrated yet, leave a tombstone so the old clusters stay intact.
+            position = self._retired._probe(key, key_hash, False)
+            self._retired._clear(position, TOMBSTONE)
+            self.count -= 1
+            self._modifications += 1
+            return
         self.count -= 1
-        # Start moving over the cluster
-        position = (position + 1) % self.table_size
-        while self.array[position] is not None:
-            key2, value = self.array[position]
-            self.array[position] = None
-            # Reinsert.
-            newpos = self._linear_probe(key2, True)
-            self.array[newpos] = (key2, value)
-            position = (position + 1) % self.table_size
+        self._modifications += 1
+        if self.tombstones:
+            self._clear(position, TOMBSTONE)
+            self.tombstone_count += 1
+            if self.tombstone_count > self.compaction_threshold * self.table_size:
+                self._compact()
+            return
+        # Remove the element
+        self._clear(position)
+        if self.robin_hood:
+            self._backward_shift(position)
+        else:
+            self._close_gap(position)
+
+    def _close_gap(self, position: int) -> None:
+        """
+        Close the gap left at position by moving back every key in the rest of
+        the cluster whose initial position is at or before the gap.
+        Leaves the same layout as reinserting the rest of the cluster.
+
+        :complexity: O(C) where C is the length of the rest of the cluster.
+        """
+        following = (position + 1) % self.table_size
+        while self.hashes[following] is not None:
+            if self._distance(following, self.hashes[following]) >= (following - position) % self.table_size:
+                self._copy(self, following, position, self.hashes[following])
+                self._clear(following)
+                position = following
+            following = (following + 1) % self.table_size
+
+    def _backward_shift(self, position: int) -> None:
+        """
+        Close the gap left at position by moving the rest of the cluster
+        back one slot, stopping at a key already in its initial position.
+        Keeps a Robin Hood cluster ordered by initial position.
+
+        :complexity: O(C) where C is the length of the rest of the cluster.
+        """
+        following = (position + 1) % self.table_size
+        while self.hashes[following] is not None and self._distance(following, self.hashes[following]) > 0:
+            self._copy(self, following, position, self.hashes[following])
+            self._clear(following)
+            position = following
+            following = (following + 1) % self.table_size
 
     def is_empty(self) -> bool:
         return self.count == 0
@@ -195,21 +669,128 @@ class LinearProbeTable(Generic[K, V]):
         """
         Need to resize table and reinsert all values
 
-        :complexity best: O(N*hash(K)) No probing.
-        :complexity worst: O(N*hash(K) + N^2*comp(K)) Lots of probing.
-        Where N is len(self)
+        :complexity: See _resize.
         """
-        old_array = self.array
-        self.size_index += 1
-        if self.size_index >= len(self.TABLE_SIZES):
+        size = self.policy.size_at(self.size_index + 1)
+        if size is None:
             # Cannot be resized further.
             return
-        self.array = ArrayR(self.TABLE_SIZES[self.size_index])
-        self.count = 0
-        for item in old_array:
-            if item is not None:
-                key, value = item
-                self[key] = value
+        self.size_index += 1
+        if self.incremental and self._hash_is_full():
+            self._begin_migration(size)
+        else:
+            self._resize(size)
+
+    def _begin_migration(self, size: int) -> None:
+        """
+        Switch to fresh arrays of the given size, keeping the old ones in a
+        retired table to migrate from.
+        Only valid for full hashes, which locate keys in either array.
+
+        :complexity: O(size) to allocate the arrays, see _finish_migration
+                     if a migration was still going.
+        """
+        self._finish_migration()
+        start = time.perf_counter() if self._stats is not None else 0.0
+        retired = copy.copy(self)
+        self._allocate(size)
+        self._modifications += 1
+        self._retired = retired
+        self._migrate_position = 0
+        if self._stats is not None:
+            self._stats.record_rehash(time.perf_counter() - start)
+
+    def _step_migration(self) -> None:
+        """
+        Migrate the next migration_step slots, if migrating.
+
+        :complexity: O(migration_step * linear probe)
+        """
+        if self._retired is not None:
+            self._migrate(self.migration_step)
+
+    def _finish_migration(self) -> None:
+        """
+        Migrate all remaining slots, if migrating.
+
+        :complexity: O(N * linear probe) where N is the old table size.
+        """
+        if self._retired is not None:
+            self._migrate(self._retired.table_size)
+
+    def _migrate(self, steps: int) -> None:
+        """
+        Move the entries in the next few old slots into the new arrays.
+        Moved slots become tombstones, so old clusters stay searchable.
+
+        :complexity: O(steps * linear probe)
+        """
+        start = time.perf_counter() if self._stats is not None else 0.0
+        retired = self._retired
+        end = min(self._migrate_position + steps, retired.table_size)
+        for i in range(self._migrate_position, end):
+            if retired._is_live(i):
+                self._place(retired, i, retired.hashes[i])
+                retired._clear(i, TOMBSTONE)
+        self._migrate_position = end
+        if end == retired.table_size:
+            self._retired = None
+        if self._stats is not None:
+            self._stats.record_migration(time.perf_counter() - start)
+
+    def _compact(self) -> None:
+        """
+        Reinsert all values at the same size, clearing out the tombstones.
+
+        :complexity: See _resize.
+        """
+        self._resize(self.table_size)
+
+    def _resize(self, size: int) -> None:
+        """
+        Move all values into fresh arrays of the given size, skipping tombstones.
+        Stored full hashes are reduced modulo the new size instead of being
+        recomputed, and no keys are compared.
+
+        :complexity best: O(N) No probing.
+        :complexity worst: O(N^2) Lots of probing.
+        Where N is the table size. Growing with an overwritten `hash` adds O(len(self)*hash(K)).
+        """
+        self._finish_migration()
+        start = time.perf_counter() if self._stats is not None else 0.0
+        old = copy.copy(self)
+        self._allocate(size)
+        self._modifications += 1
+        reuse_hashes = self._hash_is_full() or size == old.table_size
+        for i in range(old.table_size):
+            if old._is_live(i):
+                key_hash = old.hashes[i] if reuse_hashes else self.hash(old._key_at(i))
+                self._place(old, i, key_hash)
+        if self._stats is not None:
+            self._stats.record_rehash(time.perf_counter() - start)
+
+    def load_factor(self) -> float:
+        """
+        Ratio of entries to slots.
+        """
+        return len(self) / self.table_size
+
+    def stats(self) -> dict:
+        """
+        Returns the current load factor and longest cluster (tombstones
+        included), plus the recorded probe length histogram, rehash count
+        and rehash time if stats are enabled.
+        While migrating, the cluster is measured in the new array.
+
+        :complexity: O(N) where N is the table size.
+        """
+        result = {
+            "load_factor": self.load_factor(),
+            "longest_cluster": longest_cluster(self.hashes),
+        }
+        if self._stats is not None:
+            result.update(self._stats.report())
+        return result
 
     def __str__(self) -> str:
         """
@@ -218,8 +799,10 @@ class LinearProbeTable(Generic[K, V]):
         :complexity: O(N * (str(key) + str(value))) where N is the table size
         """
         result = ""
-        for item in self.array:
-            if item is not None:
-                (key, value) = item
+        for position in range(self.table_size):
+            if self._is_live(position):
+                (key, value) = self._key_at(position), self._value_at(position)
                 result += "(" + str(key) + "," + str(value) + ")\n"
-        return result
\ No newline at end of file
+        if self._retired is not None:
+            result += str(self._retired)
+        return result
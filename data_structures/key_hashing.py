@@ -0,0 +1,50 @@
+""" Key Hashing
+
+Full hashes for the key types the hash tables support: strings, integers
+and tuples of supported keys. Full hashes do not depend on any table size,
+reducing one modulo a table size gives a position in that table.
+"""
+from __future__ import annotations
+
+__docformat__ = 'reStructuredText'
+
+HASH_BASE = 31
+# Mersenne prime, so full hashes stay independent of the table size.
+HASH_MODULUS = (1 << 61) - 1
+
+_MASK_64 = (1 << 64) - 1
+
+
+def mix_int(n: int) -> int:
+    """
+    Hash an integer, scrambling its bits (with the splitmix64 finaliser) so
+    that runs of nearby integers do not fill runs of nearby slots.
+
+    :complexity: O(1) for integers of up to 64 bits.
+    """
+    n = (n % HASH_MODULUS + 0x9E3779B97F4A7C15) & _MASK_64
+    n = ((n ^ (n >> 30)) * 0xBF58476D1CE4E5B9) & _MASK_64
+    n = ((n ^ (n >> 27)) * 0x94D049BB133111EB) & _MASK_64
+    return (n ^ (n >> 31)) % HASH_MODULUS
+
+
+def full_hash(key: str | int | tuple) -> int:
+    """
+    Hash a string, integer or tuple of those, independently of any table size.
+
+    :complexity: O(len(key)) for strings, O(1) for integers, and the sum over
+        the items for tuples.
+    """
+    if isinstance(key, int):
+        return mix_int(key)
+    if isinstance(key, tuple):
+        value = len(key)
+        for item in key:
+            value = mix_int(value * HASH_BASE + full_hash(item))
+        return value
+    value = 0
+    a = 31415
+    for char in key:
+        value = (ord(char) + a * value) % HASH_MODULUS
+        a = a * HASH_BASE % (HASH_MODULUS - 1)
+    return value
@@ -0,0 +1,73 @@
+""" Probe Sequences
+
+Open addressing probe sequences for LinearProbeTable.
+
+A probe sequence starts at a key's initial position, hash % size, and moves
+on by a step, which itself grows by a fixed amount after every move:
+    - Linear:     +1, +1, +1, ...
+    - Quadratic:  +1, +2, +3, ... (triangular offsets)
+    - Double:     +s, +s, +s, ... where s comes from the rest of the hash.
+"""
+from __future__ import annotations
+
+__docformat__ = 'reStructuredText'
+
+from abc import ABC, abstractmethod
+
+
+class ProbeSequence(ABC):
+    """ Abstract probe sequence. """
+
+    name = ""
+
+    @abstractmethod
+    def steps(self, key_hash: int, size: int) -> tuple[int, int]:
+        """
+        Returns the first step of the sequence for this hash, and how much
+        the step grows by after each move.
+        """
+        pass
+
+
+class LinearProbing(ProbeSequence):
+    """
+    Linear probing. Reaches every slot.
+    """
+
+    name = "linear"
+
+    def steps(self, key_hash: int, size: int) -> tuple[int, int]:
+        return 1, 0
+
+
+class QuadraticProbing(ProbeSequence):
+    """
+    Quadratic probing, with triangular offsets from the initial position.
+    On a prime size this reaches (size + 1) / 2 slots, which is enough
+    for a max load factor of at most 0.5.
+    """
+
+    name = "quadratic"
+
+    def steps(self, key_hash: int, size: int) -> tuple[int, int]:
+        return 1, 1
+
+
+class DoubleHashing(ProbeSequence):
+    """
+    Double hashing, stepping by an amount taken from the bits of the full
+    hash above the initial position. On a prime size this reaches every slot.
+    Hashes smaller than the size (from an overwritten `hash`) step by 1.
+    """
+
+    name = "double"
+
+    def steps(self, key_hash: int, size: int) -> tuple[int, int]:
+        if size == 1:
+            return 1, 0
+        return 1 + (key_hash // size) % (size - 1), 0
+
+
+LINEAR = LinearProbing()
+QUADRATIC = QuadraticProbing()
+DOUBLE = DoubleHashing()
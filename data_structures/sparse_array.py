@@ -0,0 +1,97 @@
+""" Sparse Array
+
+An array of references, like ArrayR, that only stores its non-None
+entries: their indices in a sorted list, and the entries alongside.
+Suits long arrays that hold only a few entries.
+"""
+from __future__ import annotations
+
+__docformat__ = 'reStructuredText'
+
+from bisect import bisect_left
+from typing import TypeVar, Generic, Iterator
+
+from data_structures.referential_array import ArrayR
+
+T = TypeVar('T')
+
+
+class SparseArray(Generic[T]):
+
+    __slots__ = ("length", "indices", "entries")
+
+    def __init__(self, length: int) -> None:
+        """ Creates an array of the given length, holding only None
+        :complexity: O(1)
+        :pre: length > 0
+        """
+        if length <= 0:
+            raise ValueError("Array length should be larger than 0.")
+        self.length = length
+        self.indices: list[int] = []
+        self.entries: list[T] = []
+
+    def __len__(self) -> int:
+        """ Returns the length of the array
+        :complexity: O(1)
+        """
+        return self.length
+
+    def taken(self) -> int:
+        """ Returns the number of non-None entries
+        :complexity: O(1)
+        """
+        return len(self.indices)
+
+    def __getitem__(self, index: int) -> T:
+        """ Returns the object in position index.
+        :complexity: O(log(N)) where N is the number of non-None entries
+        :pre: index in between 0 and length
+        """
+        i = bisect_left(self.indices, index)
+        if i < len(self.indices) and self.indices[i] == index:
+            return self.entries[i]
+        return None
+
+    def __setitem__(self, index: int, value: T) -> None:
+        """ Sets the object in position index to value
+        :complexity: O(N) where N is the number of non-None entries
+        :pre: index in between 0 and length
+        """
+        if not 0 <= index < self.length:
+            raise IndexError("invalid index")
+        i = bisect_left(self.indices, index)
+        present = i < len(self.indices) and self.indices[i] == index
+        if value is None:
+            if present:
+                del self.indices[i]
+                del self.entries[i]
+        elif present:
+            self.entries[i] = value
+        else:
+            self.indices.insert(i, index)
+            self.entries.insert(i, value)
+
+    def __iter__(self) -> Iterator[T]:
+        """ Iterates over every position, None included
+        :complexity: O(length)
+        """
+        i = 0
+        for index in range(self.length):
+            if i < len(self.indices) and self.indices[i] == index:
+                yield self.entries[i]
+                i += 1
+            else:
+                yield None
+
+    def to_array(self) -> ArrayR[T]:
+        """ Returns an ArrayR holding the same entries
+        :complexity: O(length)
+        """
+        array = ArrayR(self.length)
+        for index, value in zip(self.indices, self.entries):
+            array[index] = value
+        return array
+
+    def __str__(self) -> str:
+        return str(list(self))
@@ -0,0 +1,273 @@
+""" Table Snapshot
+
+Binary snapshots of a DoubleKeyTable, which can be reopened through mmap
+and searched in place, without rebuilding the table.
+
+Layout (little-endian):
+    - Header: magic, top-level size, number of rows, number of pairs.
+    - Top-level slots: (hash, key offset, row offset) each.
+    - For each row: (size, number of pairs), then (hash, key offset, value offset) slots.
+    - Blobs: a length, then a pickled key or value.
+
+Slots are placed by linear probing on key_hashing.full_hash, which does not
+depend on the process (unlike the builtin `hash`) or on any overwritten
+hash1/hash2, so keys must be strings, integers or tuples of those.
+A key offset of 0 marks an empty slot.
+"""
+from __future__ import annotations
+
+__docformat__ = 'reStructuredText'
+
+import mmap
+import pickle
+import struct
+from typing import Iterable, Iterator
+
+from data_structures.key_hashing import full_hash
+
+MAGIC = b"DKT\x01"
+HEADER = struct.Struct("<4sIIQ")
+SLOT = struct.Struct("<QQQ")
+ROW = struct.Struct("<II")
+LENGTH = struct.Struct("<I")
+
+# Fixed, so the same table always gives the same file.
+PICKLE_PROTOCOL = 4
+
+
+def _place(slots: list, key_hash: int, entry: tuple) -> None:
+    """
+    Put entry in the first empty slot from key_hash, by linear probing.
+
+    :complexity: O(N) where N is len(slots).
+    """
+    position = key_hash % len(slots)
+    while slots[position] is not None:
+        position = (position + 1) % len(slots)
+    slots[position] = entry
+
+
+def save_snapshot(path: str, size: int, rows: Iterable[tuple], total: int) -> None:
+    """
+    Write a snapshot of a table with this top-level size.
+
+    :param rows: (key1, row size, [(key2, value), ...]) for each row. The
+        row size is the number of slots to lay the row out in.
+    :param total: Number of (key1, key2) pairs.
+    :complexity: O(S + total) plus hashing and pickling, where S is the
+        total size of the tables.
+    """
+    rows = list(rows)
+    offset = HEADER.size + size * SLOT.size
+    row_offsets = []
+    for _, row_size, _ in rows:
+        row_offsets.append(offset)
+        offset += ROW.size + row_size * SLOT.size
+
+    data = bytearray(offset)
+    HEADER.pack_into(data, 0, MAGIC, size, len(rows), total)
+
+    def blob(item) -> int:
+        """ Append a pickled item and return its offset. """
+        start = len(data)
+        pickled = pickle.dumps(item, protocol=PICKLE_PROTOCOL)
+        data.extend(LENGTH.pack(len(pickled)))
+        data.extend(pickled)
+        return start
+
+    outer_slots = [None] * size
+    for (key1, row_size, items), row_offset in zip(rows, row_offsets):
+        key_hash = full_hash(key1)
+        _place(outer_slots, key_hash, (key_hash, blob(key1), row_offset))
+        inner_slots = [None] * row_size
+        for key2, value in items:
+            key_hash = full_hash(key2)
+            _place(inner_slots, key_hash, (key_hash, blob(key2), blob(value)))
+        ROW.pack_into(data, row_offset, row_size, len(items))
+        for i, slot in enumerate(inner_slots):
+            if slot is not None:
+                SLOT.pack_into(data, row_offset + ROW.size + i * SLOT.size, *slot)
+    for i, slot in enumerate(outer_slots):
+        if slot is not None:
+            SLOT.pack_into(data, HEADER.size + i * SLOT.size, *slot)
+
+    with open(path, "wb") as file:
+        file.write(data)
+
+
+class MappedDoubleKeyTable:
+    """
+    Mapped Double Key Table.
+
+    Read-only view of a snapshot written by DoubleKeyTable.save. The file is
+    memory-mapped, and lookups probe the slots in the file directly, only
+    unpickling the keys whose hashes match and the values found.
+
+    Keys and values are pickled, so only open snapshots you trust.
+
+    Unless stated otherwise, all methods have O(1) complexity.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        :raises ValueError: When the file is not a snapshot.
+        """
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < HEADER.size:
+            self._map.close()
+            raise ValueError(f"{path} is not a table snapshot.")
+        magic, self.table_size, self.count, self.total_count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} is not a table snapshot.")
+
+    def close(self) -> None:
+        """
+        Unmap the file.
+        """
+        self._map.close()
+
+    def __enter__(self) -> MappedDoubleKeyTable:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _blob(self, offset: int):
+        """
+        Unpickle the item at offset.
+
+        :complexity: O(size of the item)
+        """
+        length, = LENGTH.unpack_from(self._map, offset)
+        start = offset + LENGTH.size
+        return pickle.loads(self._map[start:start + length])
+
+    def _probe(self, offset: int, size: int, key) -> int:
+        """
+        Find key in the slots starting at offset, by linear probing.
+        Returns the third field of its slot (row or value offset).
+
+        :raises KeyError: When the key is not there.
+        :complexity: O(hash(key) + N) where N is the length of the cluster probed.
+        """
+        key_hash = full_hash(key)
+        position = key_hash % size
+        for _ in range(size):
+            slot_hash, key_offset, payload = SLOT.unpack_from(self._map, offset + position * SLOT.size)
+            if key_offset == 0:
+                break
+            if slot_hash == key_hash and self._blob(key_offset) == key:
+                return payload
+            position = (position + 1) % size
+        raise KeyError(key)
+
+    def _row(self, key1) -> tuple[int, int, int]:
+        """
+        Returns the offset of the slots of the row for key1, their number and
+        the number of pairs in the row.
+
+        :raises KeyError: When there is no such row.
+        """
+        row_offset = self._probe(HEADER.size, self.table_size, key1)
+        size, count = ROW.unpack_from(self._map, row_offset)
+        return row_offset + ROW.size, size, count
+
+    def _slots(self, offset: int, size: int) -> Iterator[tuple[int, int]]:
+        """
+        Yields (key offset, payload) for each taken slot.
+
+        :complexity: O(size)
+        """
+        for position in range(size):
+            _, key_offset, payload = SLOT.unpack_from(self._map, offset + position * SLOT.size)
+            if key_offset != 0:
+                yield key_offset, payload
+
+    def __getitem__(self, key: tuple):
+        """
+        Get the value at a certain key.
+
+        :raises KeyError: when the key doesn't exist.
+        :complexity: See _probe, for both keys.
+        """
+        offset, size, _ = self._row(key[0])
+        return self._blob(self._probe(offset, size, key[1]))
+
+    def __contains__(self, key: tuple) -> bool:
+        try:
+            _ = self[key]
+        except KeyError:
+            return False
+        else:
+            return True
+
+    def __len__(self) -> int:
+        """
+        Returns the number of top-level keys.
+        """
+        return self.count
+
+    def total_len(self) -> int:
+        """
+        Returns the number of (key1, key2) pairs.
+        """
+        return self.total_count
+
+    def row_len(self, key1) -> int:
+        """
+        Returns the number of bottom-level keys for key1.
+
+        :raises KeyError: when key1 doesn't exist.
+        """
+        return self._row(key1)[2]
+
+    def iter_items(self, key=None) -> Iterator[tuple]:
+        """
+        key = None:
+            Returns an iterator of all ((key1, key2), value) in the table.
+        key = k:
+            Returns an iterator of all (key2, value) in the row for k.
+
+        :complexity: O(N) where N is the size of the tables read, plus unpickling.
+        """
+        if key is None:
+            for key_offset, row_offset in self._slots(HEADER.size, self.table_size):
+                key1 = self._blob(key_offset)
+                size, _ = ROW.unpack_from(self._map, row_offset)
+                for key2_offset, value_offset in self._slots(row_offset + ROW.size, size):
+                    yield (key1, self._blob(key2_offset)), self._blob(value_offset)
+        else:
+            try:
+                offset, size, _ = self._row(key)
+            except KeyError:
+                return
+            for key_offset, value_offset in self._slots(offset, size):
+                yield self._blob(key_offset), self._blob(value_offset)
+
+    def iter_keys(self, key=None) -> Iterator:
+        """
+        key = None: Returns an iterator of all top-level keys.
+        key = k: Returns an iterator of all keys in the row for k.
+        """
+        if key is None:
+            for key_offset, _ in self._slots(HEADER.size, self.table_size):
+                yield self._blob(key_offset)
+        else:
+            for key2, _ in self.iter_items(key):
+                yield key2
+
+    def iter_values(self, key=None) -> Iterator:
+        """
+        key = None: Returns an iterator of all values.
+        key = k: Returns an iterator of all values in the row for k.
+        """
+        for _, value in self.iter_items(key):
+            yield value
+
+    def keys(self, key=None) -> list:
+        return list(self.iter_keys(key))
+
+    def values(self, key=None) -> list:
+        return list(self.iter_values(key))
@@ -0,0 +1,85 @@
+""" Table Stats
+
+Instrumentation that hash tables record into when stats are enabled.
+Tables without stats hold None instead, and skip recording entirely.
+"""
+from __future__ import annotations
+
+__docformat__ = 'reStructuredText'
+
+from data_structures.referential_array import ArrayR
+
+
+class TableStats:
+    """
+    Table Stats.
+
+    Counts probe lengths (slots visited per lookup/insert), resizes and the
+    time spent resizing. One instance can be shared between several tables,
+    e.g. all internal tables of a DoubleKeyTable.
+    """
+
+    def __init__(self) -> None:
+        # probe_histogram[n] is the number of probes that visited n slots.
+        self.probe_histogram: list[int] = []
+        self.rehash_count = 0
+        self.rehash_time = 0.0
+
+    def record_probe(self, length: int) -> None:
+        """
+        Record a probe that visited length slots.
+
+        :complexity: O(1) amortised.
+        """
+        while len(self.probe_histogram) <= length:
+            self.probe_histogram.append(0)
+        self.probe_histogram[length] += 1
+
+    def record_rehash(self, seconds: float) -> None:
+        """
+        Record a resize (or compaction) that took this long.
+        """
+        self.rehash_count += 1
+        self.rehash_time += seconds
+
+    def record_migration(self, seconds: float) -> None:
+        """
+        Record time spent migrating entries after an incremental resize.
+        """
+        self.rehash_time += seconds
+
+    def report(self) -> dict:
+        """
+        Returns the recorded stats, with the histogram as {length: count}.
+
+        :complexity: O(L) where L is the longest probe recorded.
+        """
+        return {
+            "probe_histogram": {length: count for length, count in enumerate(self.probe_histogram) if count},
+            "rehash_count": self.rehash_count,
+            "rehash_time": self.rehash_time,
+        }
+
+
+def longest_cluster(array: ArrayR) -> int:
+    """
+    Length of the longest run of taken (not None) slots, wrapping around the end.
+
+    :complexity: O(N) where N is len(array).
+    """
+    size = len(array)
+    # Start just after an empty slot, so no run is split by the wrap around.
+    start = 0
+    while start < size and array[start] is not None:
+        start += 1
+    if start == size:
+        return size
+    longest = 0
+    run = 0
+    for offset in range(1, size + 1):
+        if array[(start + offset) % size] is None:
+            run = 0
+        else:
+            run += 1
+            longest = max(longest, run)
+    return longest
@@ -1,57 +1,189 @@
 from __future__ import annotations
 
-from typing import Generic, TypeVar, Iterator
+import time
+from typing import Generic, TypeVar, Iterator, Iterable
 from data_structures.hash_table import LinearProbeTable, FullError
+from data_structures.growth_policy import GrowthPolicy
 from data_structures.referential_array import ArrayR
+from data_structures.table_stats import TableStats, longest_cluster
+from data_structures.key_hashing import full_hash
+from data_structures.table_snapshot import MappedDoubleKeyTable, save_snapshot
 
 K1 = TypeVar('K1')
 K2 = TypeVar('K2')
 V = TypeVar('V')
 
+class InternalTable(LinearProbeTable[K2, V]):
+    """
+    Internal table of a DoubleKeyTable.
+
+    Hashes its keys with the `hash2` of a strategy object shared by every
+    internal table (the DoubleKeyTable itself), so each row holds a single
+    slot instead of a closure of its own.
+    """
+
+    __slots__ = ("strategy",)
+
+    def __init__(self, strategy: DoubleKeyTable[K1, K2, V], policy: GrowthPolicy, stats: TableStats | None = None) -> None:
+        """
+        :param strategy: Anything with a hash2(key, sub_table) method.
+        :param policy: Growth policy, shared between internal tables.
+        :param stats: TableStats to record into, shared between internal tables.
+        """
+        LinearProbeTable.__init__(self, policy=policy, stats=stats)
+        self.strategy = strategy
+
+    def hash(self, key: K2) -> int:
+        """
+        Hash a key for insert/retrieve/update into the hashtable.
+
+        :complexity: See the strategy's hash2.
+        """
+        return self.strategy.hash2(key, self)
+
+
+class SmallRow(Generic[K2, V]):
+    """
+    Small row of a DoubleKeyTable.
+
+    Holds a few (key2, value) pairs inline, alternating in a single list,
+    and finds keys by comparing them in turn rather than hashing them.
+    The DoubleKeyTable replaces it with an InternalTable once it holds
+    more than the table's small_row_limit.
+
+    Unless stated otherwise, all methods have O(N*comp(K)) complexity,
+    where N is the number of pairs (at most small_row_limit).
+    """
+
+    __slots__ = ("items",)
+
+    def __init__(self) -> None:
+        """
+        :complexity: O(1)
+        """
+        # key, value, key, value, ...
+        self.items = []
+
+    def _linear_probe(self, key: K2, is_insert: bool) -> int:
+        """
+        Find the index of the pair for this key, or where it would go if inserting.
+
+        :raises KeyError: When the key is not in the row, but is_insert is False.
+        """
+        for index in range(0, len(self.items), 2):
+            if self.items[index] == key:
+                return index // 2
+        if is_insert:
+            return len(self)
+        raise KeyError(key)
+
+    def __len__(self) -> int:
+        """
+        :complexity: O(1)
+        """
+        return len(self.items) // 2
+
+    def __contains__(self, key: K2) -> bool:
+        try:
+            self._linear_probe(key, False)
+        except KeyError:
+            return False
+        else:
+            return True
+
+    def __getitem__(self, key: K2) -> V:
+        """
+        :raises KeyError: when the key doesn't exist.
+        """
+        return self.items[2 * self._linear_probe(key, False) + 1]
+
+    def __setitem__(self, key: K2, data: V) -> None:
+        index = self._linear_probe(key, True)
+        if index == len(self):
+            self.items.append(key)
+            self.items.append(data)
+        else:
+            self.items[2 * index + 1] = data
+
+    def __delitem__(self, key: K2) -> None:
+        """
+        Moves the last pair into the gap.
+
+        :raises KeyError: when the key doesn't exist.
+        """
+        index = 2 * self._linear_probe(key, False)
+        self.items[index:index + 2] = self.items[-2:]
+        del self.items[-2:]
+
+    def iter_keys(self) -> Iterator[K2]:
+        return iter(self.items[::2])
+
+    def iter_values(self) -> Iterator[V]:
+        return iter(self.items[1::2])
+
+    def iter_items(self) -> Iterator[tuple[K2, V]]:
+        return zip(self.items[::2], self.items[1::2])
+
+
 class DoubleKeyTable(Generic[K1, K2, V]):
     """
     Double Hash Table.
 
     Type Arguments:
-        - K1:   1st Key Type. In most cases should be string.
-                Otherwise `hash1` should be overwritten.
-        - K2:   2nd Key Type. In most cases should be string.
-                Otherwise `hash2` should be overwritten.
+        - K1:   1st Key Type. Strings, integers and tuples of those
+                are hashed natively. Otherwise `hash1` should be overwritten.
+        - K2:   2nd Key Type. Strings, integers and tuples of those
+                are hashed natively. Otherwise `hash2` should be overwritten.
         - V:    Value Type.
 
     Unless stated otherwise, all methods have O(1) complexity.
     """
 
-    # No test case should exceed 1 million entries.
+    # Past these, the default growth policies generate larger primes.
     TABLE_SIZES = [5, 13, 29, 53, 97, 193, 389, 769, 1543, 3079, 6151, 12289, 24593, 49157, 98317, 196613, 393241, 786433, 1572869]
 
     HASH_BASE = 31
 
-    def __init__(self, sizes:list|None=None, internal_sizes:list|None=None) -> None:
+    def __init__(self, sizes:list|None=None, internal_sizes:list|None=None, policy:GrowthPolicy|None=None, internal_policy:GrowthPolicy|None=None, stats:bool=False, reverse_index:bool=False, small_row_limit:int=0) -> None:
         """
         Initialise the Hash Table.
+
+        sizes/internal_sizes bound the growth of the top-level/internal tables.
+        Without them, the policies (by default TABLE_SIZES and on to larger primes)
+        decide it. The internal policy is shared by every internal table.
+        With stats, the top-level and internal tables record probe lengths and
+        resizes for stats(). The internal tables all record into one TableStats.
+        With reverse_index, a table from each key2 to its key1s is kept up to
+        date, for iter_keys_by_second/iter_values_by_second.
+        Rows with at most small_row_limit entries are kept as a SmallRow
+        instead of an InternalTable (0, the default, turns this off).
         """
         """complexity: O(1)"""
-        if sizes is not None: # O(1)
-            self.table_sizes = sizes
-        else:
-            self.table_sizes = self.TABLE_SIZES
+        if policy is None: # O(1)
+            policy = GrowthPolicy(self.TABLE_SIZES if sizes is None else sizes, bounded=sizes is not None)
+        self.policy = policy
         self.size_index = 0
-        self.array:ArrayR[tuple[K1, V]] = ArrayR(self.table_sizes[self.size_index])
+        self.array:ArrayR[tuple[K1, V]] = ArrayR(self.policy.size_at(self.size_index))
         self.count = 0
-        if internal_sizes is not None: # O(1)
-            self.internal_sizes = internal_sizes
-        else:
-            self.internal_sizes = self.TABLE_SIZES
-        
+        self.total_count = 0
+        if internal_policy is None: # O(1)
+            internal_policy = GrowthPolicy(self.TABLE_SIZES if internal_sizes is None else internal_sizes, bounded=internal_sizes is not None)
+        self.internal_policy = internal_policy
+        self._stats:TableStats|None = TableStats() if stats else None
+        self._internal_stats:TableStats|None = TableStats() if stats else None
+        self.small_row_limit = small_row_limit
+        # key2 -> table of the key1s it appears with (as keys, values unused).
+        self._reverse_index:LinearProbeTable[K2, LinearProbeTable[K1, None]]|None = LinearProbeTable() if reverse_index else None
+
 
     def hash1(self, key: K1) -> int:
         """
         Hash the 1st key for insert/retrieve/update into the hashtable.
 
-        :complexity: O(len(key))
+        :complexity: O(len(key)), see key_hashing.full_hash for other keys
         """
- 
+        if not isinstance(key, str):
+            return full_hash(key) % self.table_size
         value = 0
         a = 31415
         for char in key:
@@ -63,9 +195,10 @@ class DoubleKeyTable(Generic[K1, K2, V]):
         """
         Hash the 2nd key for insert/retrieve/update into the hashtable.
 
-        :complexity: O(len(key))
+        :complexity: O(len(key)), see key_hashing.full_hash for other keys
         """
-
+        if not isinstance(key, str):
+            return full_hash(key) % sub_table.table_size
         value = 0
         a = 31415
         for char in key:
@@ -73,37 +206,69 @@ class DoubleKeyTable(Generic[K1, K2, V]):
             a = a * self.HASH_BASE % (sub_table.table_size - 1)
         return value
     
-    def _linear_probe(self, key1: K1, key2: K2, is_insert: bool) -> tuple[int, int]:
+    def _outer_probe(self, key1: K1, is_insert: bool) -> int:
         """
-        Find the correct position for this key in the hash table using linear probing.
+        Find the position of the row for key1 in the top-level table using
+        linear probing. When inserting, an empty row is created if needed.
 
-        :raises KeyError: When the key pair is not in the table, but is_insert is False.
-        :raises FullError: When a table is full and cannot be inserted.
+        :raises KeyError: When the row is not in the table, but is_insert is False.
+        :raises FullError: When the top-level table is full and cannot be inserted.
         """
-        """complexity best = worst = O(N) N = table size, whether we are inserting or retrieving, 
-            it will probe through the entire table even if the key is at the first position"""
-        # need to check
+        """complexity best: O(hash1(K)) first position is the row or empty
+            worst: O(hash1(K) + N*comp(K)) probe through the whole cluster, N = table size"""
         outer_position = self.hash1(key1)
 
-        for _ in range(self.table_size): # O(n), n = table size
+        for distance in range(self.table_size): # O(n), n = table size
             if self.array[outer_position] is None: # O(1)
+                if self._stats is not None:
+                    self._stats.record_probe(distance + 1)
                 if is_insert: # O(1)
-                    self.array[outer_position] = (key1, LinearProbeTable(self.internal_sizes)) # O(1)
-                    internal_table = self.array[outer_position][1] # O(1)
-                    internal_table.hash = lambda k: self.hash2(k, internal_table) # O(1)
+                    if self.small_row_limit > 0: # O(1)
+                        internal_table = SmallRow()
+                    else:
+                        internal_table = InternalTable(self, self.internal_policy, self._internal_stats) # O(1)
+                    self.array[outer_position] = (key1, internal_table) # O(1)
                     self.count +=1
-                else:
-                    raise KeyError(key1) # O(1)
+                    return outer_position
+                raise KeyError(key1) # O(1)
             elif self.array[outer_position][0] == key1: # O(1)
-                break
+                if self._stats is not None:
+                    self._stats.record_probe(distance + 1)
+                return outer_position
             else:
                 outer_position = (outer_position + 1) % self.table_size # O(1)
-        
+
+        if self._stats is not None:
+            self._stats.record_probe(self.table_size)
+        if is_insert:
+            raise FullError("Table is full!")
+        raise KeyError(key1)
+
+    def _linear_probe(self, key1: K1, key2: K2, is_insert: bool) -> tuple[int, int]:
+        """
+        Find the correct position for this key in the hash table using linear probing.
+
+        :raises KeyError: When the key pair is not in the table, but is_insert is False.
+        :raises FullError: When a table is full and cannot be inserted.
+        """
+        """complexity: O(outer probe + inner probe), see _outer_probe and LinearProbeTable._linear_probe"""
+        outer_position = self._outer_probe(key1, is_insert) # O(outer probe)
         inner_table = self.array[outer_position][1] # O(1)
-        inner_position = inner_table._linear_probe(key2, is_insert) # O(1)
+        inner_position = inner_table._linear_probe(key2, is_insert) # O(inner probe)
 
         return outer_position, inner_position # O(1)
-    
+
+    def _row(self, key1: K1) -> InternalTable[K2, V] | SmallRow[K2, V] | None:
+        """
+        Returns the internal table for key1, or None if there is no such row.
+
+        :complexity: See _outer_probe.
+        """
+        try:
+            return self.array[self._outer_probe(key1, False)][1]
+        except KeyError:
+            return None
+
     def iter_keys(self, key:K1|None=None) -> Iterator[K1|K2]:
         """
         key = None:
@@ -111,28 +276,24 @@ class DoubleKeyTable(Generic[K1, K2, V]):
         key = k:
             Returns an iterator of all keys in the bottom-hash-table for k.
         """
-        """complexity best: O(1) when first position is empty, worst: O(N) when searched entire table, N = array size"""
-        # worst : O(n^2) when searched entire table and when key1=key, n = array size
-        if not key:
+        """complexity: key = None: O(N), N = table size
+            key = k: O(outer probe + M), M = internal table size"""
+        if key is None:
             for row in self.array: # O(n), n = array size
                 if row is not None: # O(1)
                     yield row[0] # O(1)
         else:
-            for row in self.array: # O(n), n = array size
-                if row is not None: # O(1)
-                    key1, value = row # O(1)
-                    if key1 == key: # O(1)
-                        for column in value.array: # O(n), n = array size
-                            if column is not None: # O(1)
-                                yield column[0] # O(1)
+            sub_table = self._row(key) # O(outer probe)
+            if sub_table is not None:
+                yield from sub_table.iter_keys() # O(m), m = internal table size
 
     def keys(self, key:K1|None=None) -> list[K1|K2]:
         """
         key = None: returns all top-level keys in the table.
         key = x: returns all bottom-level keys for top-level key x.
         """
-        return [i for i in self.iter_keys(key)] # O(n), n = array size (?)
-    
+        return [i for i in self.iter_keys(key)] # See iter_keys
+
     def iter_values(self, key:K1|None=None) -> Iterator[V]:
         """
         key = None:
@@ -140,50 +301,44 @@ class DoubleKeyTable(Generic[K1, K2, V]):
         key = k:
             Returns an iterator of all values in the bottom-hash-table for k.
         """
+        """complexity: key = None: O(N + total internal table size), N = table size
+            key = k: O(outer probe + M), M = internal table size"""
+        if key is None:
+            for row in self.array: # O(n), n = array size
+                if row is not None: # O(1)
+                    yield from row[1].iter_values() # O(m), m = internal table size
+        else:
+            sub_table = self._row(key) # O(outer probe)
+            if sub_table is not None:
+                yield from sub_table.iter_values() # O(m), m = internal table size
 
-        """complexity best : O(N) when first position is empty, worst: O(N^2) when searched entire table, N = array size"""
-        # ???????
-        for row in self.array: # O(n), n = array size
-            if row is not None: # O(1)
-                key1, value1 = row # O(1)
-                if key: # O(1)
-                    if key1 == key: # O(1)
-                        if value1 is not None: # O(1)
-                            for column in value1.array: # O(n), n = array size
-                                if column is not None: # O(1)
-                                    yield column[1] # O(1)
-                else:
-                    if value1 is not None: # O(1)
-                        for column in value1.array: # O(n), n = array size
-                            if column is not None: # O(1)
-                                yield column[1] # O(1)
-        # if key:
-        #     for row in self.array:
-        #         if row is not None:
-        #             key1, value1 = row
-        #             if key1 == key:
-        #                 if value1 is not None:
-        #                     for column in value1.array:
-        #                         if column is not None:
-        #                             yield column[1]
-        # else:
-        #     for row in self.array:
-        #         if row is not None:
-        #             key1, value1 = row
-        #             if value1 is not None:
-        #                 for column in value1.array:
-        #                     if column is not None:
-        #                         yield column[1]
-                                
-    
     def values(self, key:K1|None=None) -> list[V]:
         """
         key = None: returns all values in the table.
         key = x: returns all values for top-level key x.
         """
-        return [i for i in self.iter_values(key)] # O(n), n = array size (?)
-       
-    
+        return [i for i in self.iter_values(key)] # See iter_values
+
+    def iter_items(self, key:K1|None=None) -> Iterator[tuple]:
+        """
+        key = None:
+            Returns an iterator of all ((key1, key2), value) in hash table
+        key = k:
+            Returns an iterator of all (key2, value) in the bottom-hash-table for k.
+        """
+        """complexity: key = None: O(N + total internal table size), N = table size
+            key = k: O(outer probe + M), M = internal table size"""
+        if key is None:
+            for row in self.array: # O(n), n = array size
+                if row is not None: # O(1)
+                    key1, sub_table = row
+                    for key2, value in sub_table.iter_items(): # O(m), m = internal table size
+                        yield (key1, key2), value
+        else:
+            sub_table = self._row(key) # O(outer probe)
+            if sub_table is not None:
+                yield from sub_table.iter_items() # O(m), m = internal table size
+
     def __contains__(self, key: tuple[K1, K2]) -> bool:
         """
         Checks to see if the given key is in the Hash Table
@@ -206,10 +361,7 @@ class DoubleKeyTable(Generic[K1, K2, V]):
         """complexity: best = O(1) if key at initial position
                         worst = O(N) if lots of collision, probe through large number of occupied slots
                         N = table size"""
-        position = self._linear_probe(key[0], key[1], False)
-        return self.array[position[0]][1].array[position[1]][1]
-        # bottom = top.array[position[1]]
-        # return bottom[1]
+        return self.array[self._outer_probe(key[0], False)][1][key[1]]
 
     def __setitem__(self, key: tuple[K1, K2], data: V) -> None:
         """
@@ -218,11 +370,89 @@ class DoubleKeyTable(Generic[K1, K2, V]):
         """complexity: best = O(1) if key at initial position
                                 worst = O(N) if lots of collision, probe through large number of occupied slots
                                 N = table size"""
-        position = self._linear_probe(key[0], key[1], True)
-        self.array[position[0]][1][key[1]] = data
-        if len(self) >= (self.table_size / 2): #load factor > 0.5
+        position = self._outer_probe(key[0], True)
+        self._set_in_row(position, key[1], data)
+        if len(self) >= self.policy.load_limit(self.table_size): # max load factor reached
             self._rehash()
 
+    def _set_in_row(self, position: int, key2: K2, data: V) -> None:
+        """
+        Set key2 to data in the row at this position, keeping the counts and
+        the reverse index up to date, and promoting a small row that grows
+        past small_row_limit to an InternalTable.
+
+        :complexity: See LinearProbeTable.__setitem__, plus indexing a new pair
+            and any promotion.
+        """
+        key1, sub_table = self.array[position]
+        row_count = len(sub_table)
+        sub_table[key2] = data
+        if len(sub_table) > row_count: # key2 is new to the row
+            self.total_count += 1
+            if self._reverse_index is not None:
+                self._index(key1, key2)
+            if isinstance(sub_table, SmallRow) and len(sub_table) > self.small_row_limit:
+                self.array[position] = (key1, self._promote(sub_table))
+
+    def _promote(self, small_row: SmallRow[K2, V]) -> InternalTable[K2, V]:
+        """
+        Returns an InternalTable holding the pairs of small_row.
+
+        :complexity: O(N*hash2(K)) where N is len(small_row), plus probing.
+        """
+        sub_table = InternalTable(self, self.internal_policy, self._internal_stats)
+        for key2, data in small_row.iter_items():
+            sub_table[key2] = data
+        return sub_table
+
+    def _index(self, key1: K1, key2: K2) -> None:
+        """
+        Add a new pair to the reverse index.
+
+        :complexity: O(hash(key2) + hash(key1)) plus probing.
+        """
+        try:
+            key1s = self._reverse_index[key2]
+        except KeyError:
+            key1s = LinearProbeTable()
+            self._reverse_index[key2] = key1s
+        key1s[key1] = None
+
+    def _unindex(self, key1: K1, key2: K2) -> None:
+        """
+        Remove a deleted pair from the reverse index, dropping key2 entirely
+        once it appears with no key1.
+
+        :complexity: O(hash(key2) + hash(key1)) plus probing.
+        """
+        key1s = self._reverse_index[key2]
+        del key1s[key1]
+        if len(key1s) == 0:
+            del self._reverse_index[key2]
+
+    def iter_keys_by_second(self, key2: K2) -> Iterator[K1]:
+        """
+        Returns an iterator of all top-level keys that key2 appears with.
+        """
+        """complexity: O(hash(key2) + M) with a reverse index, M = number of matches,
+            otherwise O(N + total internal table probes), N = table size"""
+        if self._reverse_index is None:
+            for row in self.array: # O(n), n = array size
+                if row is not None and key2 in row[1]:
+                    yield row[0]
+        elif key2 in self._reverse_index:
+            yield from self._reverse_index[key2].iter_keys() # O(m), m = matches
+
+    def iter_values_by_second(self, key2: K2) -> Iterator[V]:
+        """
+        Returns an iterator of the values at (key1, key2) for every top-level
+        key1 that key2 appears with.
+        """
+        """complexity: O(hash(key2) + M*(outer probe + inner probe)) with a reverse index,
+            M = number of matches, otherwise see iter_keys_by_second"""
+        for key1 in self.iter_keys_by_second(key2):
+            yield self[key1, key2]
+
     def __delitem__(self, key: tuple[K1, K2]) -> None:
         """
         Deletes a (key, value) pair in our hash table.
@@ -231,75 +461,215 @@ class DoubleKeyTable(Generic[K1, K2, V]):
         """
         """complexity: best = O(1) if key at initial position
                                 worst = O(N) if lots of collision, probe through large number of occupied slots
-                                N = table size"""
-        position = self._linear_probe(key[0], key[1], False)
-        top = position[0]
-        bottom = position[1]
+                                N = table size, plus _close_gap if the row is removed"""
+        top = self._outer_probe(key[0], False)
+        bottom_table = self.array[top][1]
 
         #deleting bottom key
-        del self.array[top][1][key[1]]
+        del bottom_table[key[1]]
+        self.total_count -= 1
+        if self._reverse_index is not None:
+            self._unindex(key[0], key[1])
 
         # check if bottom table is empty
-        bottom_table = self.array[top][1]
-        empty = True
-        for i in range(bottom_table.table_size):
-            if bottom_table.array[i] is not None:
-                empty = False
-
-        if empty:
+        if len(bottom_table) == 0:
             self.count -= 1
             self.array[top] = None
-            # top = (top + 1) % self.table_size
-            # while self.array[top] is not None:
-            #     keykey, value = self.array[top]
-            #     self.array[top] = None
-            #     key2, value2 = value
-            #     self[keykey,key2] = value
-            #     # newpos = self._linear_probe(keykey[0], keykey[1], True)
-            #     # self.array[newpos] = (keykey, value)
-            #     top = (top + 1) % self.table_size
-                
+            self._close_gap(top)
+
+    def _group_by_row(self, keys: list[tuple[K1, K2]]) -> dict[K1, list[int]]:
+        """
+        Groups the indices of keys by their top-level key, in input order.
+
+        :complexity: O(N) where N is len(keys).
+        """
+        rows = {}
+        for index, key in enumerate(keys):
+            rows.setdefault(key[0], []).append(index)
+        return rows
+
+    def get_many(self, keys: Iterable[tuple[K1, K2]]) -> list[V]:
+        """
+        Get the values at many keys, in the order given.
+        Each top-level key is probed once, however many keys share it.
+
+        :raises KeyError: when any key doesn't exist.
+        :complexity: O(R*outer probe + N*inner probe) where R is the number
+            of distinct top-level keys and N is the number of keys.
+        """
+        keys = list(keys)
+        results = [None] * len(keys)
+        for key1, indices in self._group_by_row(keys).items():
+            sub_table = self.array[self._outer_probe(key1, False)][1]
+            for index in indices:
+                results[index] = sub_table[keys[index][1]]
+        return results
+
+    def set_many(self, items: Iterable[tuple[tuple[K1, K2], V]]) -> None:
+        """
+        Set many ((key1, key2), value) pairs. Later pairs overwrite earlier
+        ones with the same keys, as with repeated __setitem__.
+        Each top-level key is probed once, however many pairs share it.
+
+        :complexity: O(R*outer probe + N*inner probe) where R is the number
+            of distinct top-level keys and N is the number of pairs,
+            plus any rehashing.
+        """
+        items = list(items)
+        for key1, indices in self._group_by_row([key for key, _ in items]).items():
+            position = self._outer_probe(key1, True)
+            for index in indices:
+                (_, key2), data = items[index]
+                self._set_in_row(position, key2, data)
+            if len(self) >= self.policy.load_limit(self.table_size): # max load factor reached
+                self._rehash()
+
+    def _close_gap(self, position: int) -> None:
+        """
+        Close the gap left at position in the top-level table by moving back
+        every row in the rest of the cluster whose initial position is at or
+        before the gap, so that rows further along stay reachable.
+
+        :complexity: O(C*hash1(K)) where C is the length of the rest of the cluster.
+        """
+        following = (position + 1) % self.table_size
+        while self.array[following] is not None:
+            initial = self.hash1(self.array[following][0])
+            if (following - initial) % self.table_size >= (following - position) % self.table_size:
+                self.array[position] = self.array[following]
+                self.array[following] = None
+                position = following
+            following = (following + 1) % self.table_size
+
     def _rehash(self) -> None:
         """
-        Need to resize table and reinsert all values
+        Need to resize the top-level table and move every row into it.
+        Rows are moved whole, by key1 only: the internal tables are kept
+        as they are, as their hash2 does not depend on the top-level size.
 
-        :complexity best: O(N*hash(K)) No probing.
-        :complexity worst: O(N*hash(K) + N^2*comp(K)) Lots of probing.
-        Where N is len(self)
+        :complexity best: O(N + R*hash1(K)) No probing.
+        :complexity worst: O(N + R*hash1(K) + R^2) Lots of probing.
+        Where N is the old table size and R is len(self), the number of rows.
         """
         old_array = self.array
-        self.size_index += 1
-        if self.size_index >= len(self.table_sizes):
-            self.size_index -= 1
+        size = self.policy.size_at(self.size_index + 1)
+        if size is None:
             return None
-        
-        self.array = ArrayR(self.table_sizes[self.size_index])
-        self.count = 0
+        self.size_index += 1
+        start = time.perf_counter() if self._stats is not None else 0.0
+
+        self.array = ArrayR(size)
 
-        #reinsert all values
+        # Rows are unique, so each one goes in the first empty slot from its hash.
         for row in old_array:
             if row is not None:
-                key, value = row
-                if value is not None:
-                    for column in value.array:
-                        if column is not None:
-                            key2, value2 = column
-                            #  SET ITEM
-                            self[(key,key2)] = value2
+                position = self.hash1(row[0])
+                while self.array[position] is not None:
+                    position = (position + 1) % self.table_size
+                self.array[position] = row
+        if self._stats is not None:
+            self._stats.record_rehash(time.perf_counter() - start)
+
+    def save(self, path: str) -> None:
+        """
+        Write a binary snapshot of the table to path, which load reopens.
+        Keys must be strings, integers or tuples of those, and values must
+        be picklable. Each internal table keeps its size in the snapshot
+        (a small row gets 2N+1 slots for its N pairs).
+
+        :complexity: O(N + M) plus hashing and pickling, where N is the
+            table size and M is the total size of the internal tables.
+        """
+        rows = []
+        for row in self.array:
+            if row is not None:
+                key1, sub_table = row
+                if isinstance(sub_table, SmallRow):
+                    size = 2 * len(sub_table) + 1
+                else:
+                    size = sub_table.table_size
+                rows.append((key1, size, list(sub_table.iter_items())))
+        save_snapshot(path, self.table_size, rows, self.total_count)
+
+    @staticmethod
+    def load(path: str) -> MappedDoubleKeyTable:
+        """
+        Reopen a snapshot written by save as a read-only table. The file is
+        memory-mapped and searched in place, so nothing is rebuilt.
+
+        :raises ValueError: When the file is not a snapshot.
+        """
+        return MappedDoubleKeyTable(path)
+
+    def stats(self) -> dict:
+        """
+        Returns the load factor and longest cluster of the top-level table,
+        plus its recorded probe lengths and resizes if stats are enabled.
+        "internal" holds the same for the internal tables: their combined
+        load factor, their longest cluster, and what they all recorded,
+        along with the number of rows still kept as a SmallRow.
+
+        :complexity: O(N + M) where N is the table size and M is the total
+            size of the internal tables.
+        """
+        entries = 0
+        slots = 0
+        cluster = 0
+        small_rows = 0
+        for row in self.array:
+            if row is not None and isinstance(row[1], SmallRow):
+                small_rows += 1
+            elif row is not None:
+                sub_table = row[1]
+                entries += len(sub_table)
+                slots += sub_table.table_size
+                cluster = max(cluster, longest_cluster(sub_table.hashes))
+        internal = {
+            "load_factor": entries / slots if slots else 0.0,
+            "longest_cluster": cluster,
+            "small_rows": small_rows,
+        }
+        if self._internal_stats is not None:
+            internal.update(self._internal_stats.report())
+
+        result = {
+            "load_factor": len(self) / self.table_size,
+            "longest_cluster": longest_cluster(self.array),
+        }
+        if self._stats is not None:
+            result.update(self._stats.report())
+        result["internal"] = internal
+        return result
 
     @property
     def table_size(self) -> int:
         """
         Return the current size of the table (different from the length)
         """
-        return self.table_sizes[self.size_index]
+        return len(self.array)
 
     def __len__(self) -> int:
         """
         Returns number of elements in the hash table
+        (the number of top-level keys, see total_len for all pairs)
         """
         return self.count
 
+    def total_len(self) -> int:
+        """
+        Returns the number of (key1, key2) pairs in the hash table.
+        """
+        return self.total_count
+
+    def row_len(self, key1: K1) -> int:
+        """
+        Returns the number of bottom-level keys for top-level key key1.
+
+        :raises KeyError: when key1 doesn't exist.
+        :complexity: See _outer_probe.
+        """
+        return len(self.array[self._outer_probe(key1, False)][1])
+
     def __str__(self) -> str:
         """
         String representation.
@@ -308,8 +678,9 @@ class DoubleKeyTable(Generic[K1, K2, V]):
         """
 
         output = ""
-        for sub_table in self.array:
-            if sub_table is not None:
-                for key, value in sub_table:
-                    output += f"{key}: {value}\n"
+        for row in self.array:
+            if row is not None:
+                key1, sub_table = row
+                for key2, value in sub_table.iter_items():
+                    output += f"{key1}, {key2}: {value}\n"
         return output
\ No newline at end of file
@@ -1,7 +1,10 @@
 from __future__ import annotations
-from typing import Generic, TypeVar
+from typing import Generic, TypeVar, Iterator
 
+from algorithms.mergesort import mergesort
 from data_structures.referential_array import ArrayR
+from data_structures.sparse_array import SparseArray
+from data_structures.alphabet import Alphabet, LOWERCASE
 
 K = TypeVar("K")
 V = TypeVar("V")
@@ -15,25 +18,85 @@ class InfiniteHashTable(Generic[K, V]):
                 Otherwise `hash` should be overwritten.
         - V:    Value Type.
 
+    The alphabet decides which slot each character goes to, and with it
+    TABLE_SIZE. The default (ord(char) % 26) suits lowercase keys.
+    Nested tables share the alphabet of the table they are nested in.
+
+    With path compression, a nested table skips the levels at which every
+    key below it is in the same slot, remembering those slots in `skip`,
+    so a long shared prefix costs one nested table instead of one per
+    character. get_location still reports a position for every level.
+    Compression relies on the alphabet, so `hash` should not be overwritten.
+
+    With a sparse limit, tables start with a SparseArray, which only stores
+    the slots that are taken, and switch to a full ArrayR once more than
+    sparse_limit slots are. This saves memory on deep levels, which mostly
+    hold two or three entries.
+
+    Each table counts the keys below it that walking the slots cannot put
+    in order (see Alphabet.orders), so sorted iteration only sorts when
+    there are some.
+
     Unless stated otherwise, all methods have O(1) complexity.
     """
 
+    # Size with the default alphabet, tables with other alphabets set their own.
     TABLE_SIZE = 27
 
-    def __init__(self) -> None:
+    def __init__(self, alphabet: Alphabet = LOWERCASE, compress: bool = False, sparse_limit: int = 0) -> None:
         """
         Initialise the Hash Table.
         """
-        """complexity : O(1)"""
-        self.array: ArrayR[tuple[K, V]] = ArrayR(self.TABLE_SIZE)
+        """complexity : O(TABLE_SIZE), O(1) with a sparse limit"""
+        self.alphabet = alphabet
+        if alphabet is not LOWERCASE:
+            self.TABLE_SIZE = alphabet.size + 1
+        self.sparse_limit = sparse_limit
+        array_type = SparseArray if sparse_limit > 0 else ArrayR
+        self.array: ArrayR[tuple[K, V]] | SparseArray[tuple[K, V]] = array_type(self.TABLE_SIZE)
         self.count = 0
+        # Keys below this table with characters the alphabet does not order.
+        self.unordered = 0
         self.level = 0
+        self.compress = compress
+        # Positions of the levels skipped above this table, with compression.
+        self.skip: list[int] = []
 
     def hash(self, key: K) -> int:
-        if self.level < len(key):
-            return ord(key[self.level]) % (self.TABLE_SIZE-1)
+        return self._slot(key, self.level)
+
+    def _slot(self, key: K, level: int) -> int:
+        """
+        Position of key at this level, from the alphabet.
+        """
+        if level < len(key):
+            return self.alphabet.slot(key[level])
         return self.TABLE_SIZE-1
 
+    def _find(self, key: K) -> int:
+        """
+        Position of key at this level, for looking it up.
+
+        :raises KeyError: When the alphabet has no slot for a character of
+            key, so it cannot be in the table.
+        """
+        try:
+            return self.hash(key)
+        except ValueError:
+            raise KeyError("Key not found") from None
+
+    def _orders(self, key: K) -> bool:
+        """
+        Whether walking the slots puts key in order among other such keys:
+        the alphabet orders each of its characters, and `hash` is not
+        overwritten.
+
+        :complexity: O(len(key))
+        """
+        if getattr(self.hash, "__func__", None) is not InfiniteHashTable.hash or not isinstance(key, str):
+            return False
+        return all(self.alphabet.orders(char) for char in key)
+
     def __getitem__(self, key: K) -> V:
         """
         Get the value at a certain key
@@ -41,44 +104,105 @@ class InfiniteHashTable(Generic[K, V]):
         :raises KeyError: when the key doesn't exist.
         """
         """complexity: O(depth) where depth is the number of nested hash tables where the key is found"""
-        position = self.hash(key) # O(1)
+        position = self._find(key) # O(1)
         if self.array[position] is None: # O(1)
             raise KeyError("Key not found") # O(1)
+        elif isinstance(self.array[position], InfiniteHashTable):
+            lower_table = self.array[position]
+            return lower_table[key]
         else:
             collision = self.array[position] # O(1)
             if collision[0] == key: # O(1)
                 return collision[1] # O(1)
-            elif isinstance(self.array[position], InfiniteHashTable):
-                lower_table = self.array[position]
-                return lower_table[key]
+            raise KeyError("Key not found") # O(1)
         
     def __setitem__(self, key: K, value: V) -> None:
         """
         Set an (key, value) pair in our hash table.
+
+        :raises ValueError: When the alphabet has no slot for a character of key.
         """
         """
         complexity: O(depth) where depth is the number of nested hash 
         tables where the position to place the key is found
         """
         position = self.hash(key)
-        
+        if not isinstance(self.array[position], InfiniteHashTable):
+            # The key ends up here, so reject it before anything changes.
+            self.alphabet.check(key)
+
         if self.array[position] is None:
             self.array[position] = (key, value)
+            if isinstance(self.array, SparseArray) and self.array.taken() > self.sparse_limit:
+                self.array = self.array.to_array()
 
         elif isinstance(self.array[position], tuple):
             collision = self.array[position]
+            if collision[0] == key:
+                self.array[position] = (key, value)
+                return
             self.array[position] = None
             # Create a new hash table and insert the previous collision
-            new_table = InfiniteHashTable()
+            new_table = InfiniteHashTable(self.alphabet, self.compress, self.sparse_limit)
             new_table.level = self.level + 1
+            if self.compress:
+                self._skip_shared(new_table, collision[0], key)
             new_table[collision[0]] = collision[1]
             # Insert the new value into the new hash table
             new_table[key] = value
             self.array[position] = new_table
 
         else:
-            self.array[position][key] = value
+            lower_table = self.array[position]
+            if self.compress:
+                lower_table = self._split(position, key)
+            lower_count = lower_table.count
+            lower_unordered = lower_table.unordered
+            lower_table[key] = value
+            if lower_table.count == lower_count: # Overwritten
+                return
+            self.unordered += lower_table.unordered - lower_unordered
+            self.count += 1
+            return
+        if not self._orders(key):
+            self.unordered += 1
         self.count += 1
+
+    def _skip_shared(self, new_table: InfiniteHashTable[K, V], key1: K, key2: K) -> None:
+        """
+        Move new_table down past the levels at which both keys are in the
+        same slot, remembering those slots in its skip.
+
+        :raises ValueError: When the keys are in the same slot at every level.
+        :complexity: O(S) where S is the number of levels skipped.
+        """
+        while self._slot(key1, new_table.level) == self._slot(key2, new_table.level):
+            if new_table.level >= max(len(key1), len(key2)):
+                raise ValueError(f"{key1!r} and {key2!r} are in the same slots at every level.")
+            new_table.skip.append(self._slot(key2, new_table.level))
+            new_table.level += 1
+
+    def _split(self, position: int, key: K) -> InfiniteHashTable[K, V]:
+        """
+        Returns the table at position that key goes into. If key leaves the
+        skipped slots of the table there, a new table is put in between at
+        that level, holding the old one, and returned instead.
+
+        :complexity: O(S + TABLE_SIZE) where S is the number of levels skipped.
+        """
+        lower_table = self.array[position]
+        for i, skipped in enumerate(lower_table.skip):
+            if self._slot(key, self.level + 1 + i) != skipped:
+                middle = InfiniteHashTable(self.alphabet, self.compress, self.sparse_limit)
+                middle.level = self.level + 1 + i
+                middle.skip = lower_table.skip[:i]
+                middle.array[skipped] = lower_table
+                middle.count = lower_table.count
+                middle.unordered = lower_table.unordered
+                lower_table.skip = lower_table.skip[i + 1:]
+                self.array[position] = middle
+                return middle
+        return lower_table
         
     def __delitem__(self, key: K) -> None:
         """
@@ -93,7 +217,7 @@ class InfiniteHashTable(Generic[K, V]):
         worst: O(depth * n) where depth is the number of nested hash tables 
         and n is the inner hash table size that the key is found
         """
-        position = self.hash(key)
+        position = self._find(key)
 
         if self.array[position] is None:
             raise KeyError("Key not found")
@@ -103,17 +227,42 @@ class InfiniteHashTable(Generic[K, V]):
                 raise KeyError("Key not found")
             self.array[position] = None
             self.count -= 1
+            if not self._orders(key):
+                self.unordered -= 1
             
         elif isinstance(self.array[position], InfiniteHashTable):
             lower_table = self.array[position]
+            lower_unordered = lower_table.unordered
             del lower_table[key]
             self.count -= 1
+            self.unordered += lower_table.unordered - lower_unordered
 
             if self.array[position].count == 1:
                 for i in range(len(self.array)):
                     if self.array[position].array[i] is not None:
                         self.array[position] = self.array[position].array[i]
                         break
+            elif self.compress:
+                self._merge(position)
+
+    def _merge(self, position: int) -> None:
+        """
+        If the table at position holds nothing but another table, replace it
+        with that table, which then also skips the slot it was in.
+
+        :complexity: O(TABLE_SIZE + S) where S is the number of levels skipped.
+        """
+        lower_table = self.array[position]
+        only = None
+        for i in range(lower_table.TABLE_SIZE):
+            if lower_table.array[i] is not None:
+                if only is not None:
+                    return
+                only = i
+        if isinstance(lower_table.array[only], InfiniteHashTable):
+            child = lower_table.array[only]
+            child.skip = lower_table.skip + [only] + child.skip
+            self.array[position] = child
 
     def __len__(self) -> int:
         return self.count
@@ -136,13 +285,14 @@ class InfiniteHashTable(Generic[K, V]):
         complexity: O(depth) where depth is the number of nested hash
         tables where the key is found
         """
-        position = self.hash(key)
+        position = self._find(key)
         location = [position]
         current_table = self
 
         while isinstance(current_table.array[position], InfiniteHashTable):
             current_table = current_table.array[position]
-            position = current_table.hash(key)
+            location.extend(current_table.skip)
+            position = current_table._find(key)
             location.append(position)
 
         if isinstance(current_table.array[position], tuple):
@@ -153,6 +303,35 @@ class InfiniteHashTable(Generic[K, V]):
         raise KeyError("Key not found")
     
 
+    def stats(self) -> dict:
+        """
+        Returns the depth distribution ({depth: number of keys stored at that
+        depth}, with depth 1 being this table), the number of tables and the
+        load factor over all of their slots.
+        Computed on demand, so there is nothing to record or enable.
+
+        :complexity: O(T * TABLE_SIZE) where T is the number of tables.
+        """
+        depths = {}
+        tables = 0
+        taken = 0
+        pending = [(self, 1)]
+        while pending:
+            table, depth = pending.pop()
+            tables += 1
+            for entry in table.array:
+                if isinstance(entry, InfiniteHashTable):
+                    taken += 1
+                    pending.append((entry, depth + 1))
+                elif entry is not None:
+                    taken += 1
+                    depths[depth] = depths.get(depth, 0) + 1
+        return {
+            "depth_histogram": dict(sorted(depths.items())),
+            "table_count": tables,
+            "load_factor": taken / (tables * self.TABLE_SIZE),
+        }
+
     def __contains__(self, key: K) -> bool:
         """
         Checks to see if the given key is in the Hash Table
@@ -166,46 +345,126 @@ class InfiniteHashTable(Generic[K, V]):
         else:
             return True
 
+    def _iter_slots(self) -> Iterator[K]:
+        """
+        Returns an iterator of all keys, walking the slots in character
+        order, with the slot for keys that end at this level first.
+        This is lexicographically sorted order while unordered is 0.
+
+        :complexity: O(T*TABLE_SIZE + N*depth) where T is the number of
+            tables and N is the number of keys.
+        """
+        for position in self.alphabet.sorted_slots:
+            entry = self.array[position]
+            if isinstance(entry, InfiniteHashTable):
+                yield from entry._iter_slots()
+            elif entry is not None:
+                yield entry[0]
+
+    def iter_sorted(self) -> Iterator[K]:
+        """
+        Returns an iterator of all keys in lexicographically sorted order.
+        While the alphabet orders every character of every key (e.g. keys of
+        lowercase letters by default), keys are streamed by walking the
+        slots, with no keys compared. Otherwise they are gathered and sorted
+        on the first call to next.
+
+        :complexity: best = O(T*TABLE_SIZE + N*depth) when the alphabet orders every key
+                     worst = that plus O(N*log(N)*comp(K)) to mergesort otherwise
+                     where T is the number of tables and N is the number of keys
+        """
+        if self.unordered == 0:
+            yield from self._iter_slots()
+        else:
+            yield from self._in_order(list(self._iter_slots()))
+
+    def _prefix_node(self, prefix: str) -> InfiniteHashTable[K, V] | tuple[K, V] | None:
+        """
+        Returns the table holding every key that starts with prefix (along
+        with any keys in the same slots that do not), the only such
+        (key, value) pair, or None if there are none.
+
+        :complexity: O(len(prefix))
+        """
+        table = self
+        try:
+            while table.level < len(prefix):
+                entry = table.array[table._slot(prefix, table.level)]
+                if entry is None:
+                    return None
+                if isinstance(entry, tuple):
+                    return entry if entry[0].startswith(prefix) else None
+                for i, skipped in enumerate(entry.skip):
+                    level = table.level + 1 + i
+                    if level >= len(prefix):
+                        break
+                    if table._slot(prefix, level) != skipped:
+                        return None
+                table = entry
+        except ValueError: # A character of prefix has no slot, so no key starts with it.
+            return None
+        return table
+
+    def keys_with_prefix(self, prefix: str) -> Iterator[str]:
+        """
+        Returns an iterator of all keys starting with prefix in
+        lexicographically sorted order, by going straight to the table
+        holding them. As with iter_sorted, keys are streamed unless that
+        table holds keys the alphabet does not order, in which case they are
+        gathered and sorted.
+
+        :complexity: best = O(len(prefix) + T*TABLE_SIZE + N*depth) when the alphabet orders every key
+                     worst = that plus O(N*log(N)*comp(K)) to mergesort otherwise
+                     where T and N are the number of tables and keys under that table.
+        """
+        node = self._prefix_node(prefix)
+        if isinstance(node, InfiniteHashTable):
+            # Keys whose characters only share slots with prefix are skipped.
+            keys = (key for key in node._iter_slots() if key.startswith(prefix))
+            if node.unordered == 0:
+                yield from keys
+            else:
+                yield from self._in_order(list(keys))
+        elif node is not None:
+            yield node[0]
+
+    def count_with_prefix(self, prefix: str) -> int:
+        """
+        Returns the number of keys starting with prefix. Order does not
+        matter, so the keys are counted straight from the slots, never sorted.
+
+        :complexity: O(len(prefix) + T*TABLE_SIZE + N*depth) where T and N
+            are the number of tables and keys under the table for prefix.
+        """
+        node = self._prefix_node(prefix)
+        if not isinstance(node, InfiniteHashTable):
+            return 0 if node is None else 1
+        count = 0
+        for key in node._iter_slots():
+            # Keys whose characters only share slots with prefix are skipped.
+            if key.startswith(prefix):
+                count += 1
+        return count
+
     def sort_keys(self, current=None) -> list[str]:
         """
         Returns all keys currently in the table in lexicographically sorted order.
         """
-        """complexity: best = O(nlogn) 
-                       worst = O(n^depth) where n is the number of keys in the table"""
-        current = current or 0
-        keys = []
-        for stuffs in self.array:
-            if stuffs is None:
-                continue
-            elif isinstance(stuffs, InfiniteHashTable):
-                current +=1
-                keys.extend(stuffs.sort_keys(current)) #O(1)
-            else:
-                keys.append(stuffs[0])
-        return self.quick_sort(keys)
-
-    # def insertion_sort(self,lst):
-    #     for i in range(1, len(lst)):
-    #         current = lst[i]
-    #         position = i
-    #         while position > 0 and lst[position-1] > current:
-    #             lst[position] = lst[position-1]
-    #             position -= 1
-    #         lst[position] = current
-    #     return lst
-    
-    def quick_sort(self, lst):
-        if len(lst) <= 1:
-            return lst
-        else:
-            pivot = lst[0]
-            less = []
-            greater = []
-            for item in lst[1:]:
-                if item < pivot:
-                    less.append(item)
-                else:
-                    greater.append(item)
-            return self.quick_sort(less) + [pivot] + self.quick_sort(greater)
-
-    
\ No newline at end of file
+        """complexity: See iter_sorted."""
+        return list(self.iter_sorted())
+
+    @staticmethod
+    def _in_order(keys: list[str]) -> list[str]:
+        """
+        Returns keys from _iter_slots in sorted order.
+
+        :complexity: best = O(N*comp(K)) when they are already in order
+                     worst = O(N*log(N)*comp(K)) to mergesort otherwise
+                     where N is len(keys)
+        """
+        # Keys the slot walk cannot order, e.g. with characters sharing a slot
+        # or from an overwritten hash, are sorted instead.
+        for i in range(1, len(keys)):
+            if keys[i] < keys[i - 1]:
+                return mergesort(keys)
+        return keys
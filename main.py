@@ -392,7 +392,6 @@ class MyWindow(arcade.Window):
         groups = self.mountain_manager.group_by_difficulty()
         to = MountainOrganiser()
         positions = DoubleKeyTable()
-        positions.hash1 = lambda k: (k % positions.table_size)
         all_mountains = []
         for i, group in enumerate(groups):
             to.add_mountains(group)
@@ -0,0 +1,336 @@
+"""
+Benchmarks for the hash tables.
+
+`python run_benchmarks.py` runs every benchmark,
+`python run_benchmarks.py robin_hood` runs just that one.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from data_structures.hash_table import LinearProbeTable
+from data_structures.probing import LINEAR, QUADRATIC, DOUBLE
+from double_key_table import DoubleKeyTable
+from infinite_hash_table import InfiniteHashTable
+from data_structures.alphabet import LOWERCASE, PRINTABLE, BYTE
+
+BENCHMARKS = {}
+
+PREFIXES = ["Mount ", "Mont ", "Monte ", "Pic ", "Piz ", "Cerro ", "Nevado ", "Volcan ", ""]
+STEMS = ["Blanc", "Rosa", "Cook", "Kenya", "Elbrus", "Aconcagua", "Denali", "Logan", "Rainier", "Whitney", "Olympus", "Etna", "Fuji", "Kosciuszko", "Vinson"]
+SUFFIXES = ["", " Peak", " North", " South", " East", " West", " Massif", " Summit", " Spire"]
+
+
+def benchmark(func):
+    """
+    Register a benchmark under its function name.
+    """
+    BENCHMARKS[func.__name__] = func
+    return func
+
+
+def mountain_names(n: int, seed: int = 0) -> list[str]:
+    """
+    Generate n distinct mountain names.
+    Like real ones, they share many prefixes and suffixes.
+    """
+    rng = random.Random(seed)
+    names = []
+    seen = set()
+    while len(names) < n:
+        name = rng.choice(PREFIXES) + rng.choice(STEMS) + rng.choice(SUFFIXES)
+        if name in seen:
+            name += " " + str(rng.randrange(10 * n))
+        if name not in seen:
+            seen.add(name)
+            names.append(name)
+    return names
+
+
+def timed(func) -> float:
+    """
+    Time a single call of func in seconds.
+    """
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def probe_distances(table: LinearProbeTable) -> list[int]:
+    """
+    Distance of every stored key from its initial position.
+    """
+    return [
+        table._distance(i, table.hashes[i])
+        for i in range(table.table_size)
+        if table.array[i] is not None
+    ]
+
+
+def probe_length(table: LinearProbeTable, key) -> int:
+    """
+    Number of slots a lookup for key visits, following the table's probe sequence.
+    """
+    key_hash = table._hash_key(key)
+    position = key_hash % table.table_size
+    step, growth = table.probing.steps(key_hash, table.table_size)
+    length = 1
+    while table.hashes[position] is not None and not (table.hashes[position] == key_hash and table._key_at(position) == key):
+        position = (position + step) % table.table_size
+        step += growth
+        length += 1
+    return length
+
+
+def report(label: str, **values) -> None:
+    print(f"  {label:<24}" + "  ".join(f"{name}={value}" for name, value in values.items()))
+
+
+@benchmark
+def robin_hood():
+    """
+    Plain linear probing against Robin Hood, just under the 0.5 load factor.
+    """
+    size = 12289
+    names = mountain_names(size // 2 - 1)
+    present = set(names)
+    missing = [name for name in mountain_names(len(names), seed=1) if name not in present]
+    for label, robin_hood in (("linear", False), ("robin hood", True)):
+        # A single size, so the table stays near the load threshold.
+        table = LinearProbeTable(sizes=[size], robin_hood=robin_hood)
+        insert = timed(lambda: [table.__setitem__(name, 0) for name in names])
+        hits = timed(lambda: [name in table for name in names])
+        misses = timed(lambda: [name in table for name in missing])
+        distances = probe_distances(table)
+        mean = sum(distances) / len(distances)
+        variance = sum((d - mean) ** 2 for d in distances) / len(distances)
+        report(
+            label,
+            insert=f"{insert:.3f}s",
+            hits=f"{hits:.3f}s",
+            misses=f"{misses:.3f}s",
+            mean_probe=f"{mean:.2f}",
+            probe_variance=f"{variance:.2f}",
+            max_probe=max(distances),
+        )
+
+
+@benchmark
+def bulk_load():
+    """
+    Inserting one at a time against update(), up to the 1 million entries TABLE_SIZES allows for.
+    """
+    for n in (100_000, 1_000_000):
+        names = mountain_names(n)
+        pairs = [(name, i) for i, name in enumerate(names)]
+        one_by_one = LinearProbeTable()
+        single = timed(lambda: [one_by_one.__setitem__(key, value) for key, value in pairs])
+        bulk = LinearProbeTable()
+        update = timed(lambda: bulk.update(pairs))
+        presized = LinearProbeTable(expected_size=n)
+        expected = timed(lambda: [presized.__setitem__(key, value) for key, value in pairs])
+        assert len(one_by_one) == len(bulk) == len(presized) == n
+        report(
+            f"n={n}",
+            one_by_one=f"{single:.2f}s",
+            update=f"{update:.2f}s",
+            expected_size=f"{expected:.2f}s",
+            table_size=bulk.table_size,
+        )
+
+
+@benchmark
+def incremental_rehash():
+    """
+    Per-insert latency with resizing all at once against incremental migration.
+    """
+    for n in (50_000, 200_000, 800_000):
+        names = mountain_names(n)
+        for label, incremental in (("all at once", False), ("incremental", True)):
+            table = LinearProbeTable(incremental=incremental)
+            latencies = []
+            for name in names:
+                start = time.perf_counter()
+                table[name] = 0
+                latencies.append(time.perf_counter() - start)
+            latencies.sort()
+            report(
+                f"n={n} {label}",
+                p99=f"{latencies[int(0.99 * n)] * 1e6:.1f}us",
+                p99_99=f"{latencies[int(0.9999 * n)] * 1e6:.1f}us",
+                max=f"{latencies[-1] * 1e3:.1f}ms",
+            )
+
+
+@benchmark
+def columnar():
+    """
+    (key, value) tuples against parallel key/value arrays: memory, inserts and overwrites.
+    """
+    n = 200_000
+    names = mountain_names(n)
+    for label, columnar in (("tuples", False), ("columnar", True)):
+        tracemalloc.start()
+        table = LinearProbeTable(expected_size=n, columnar=columnar)
+        for i, name in enumerate(names):
+            table[name] = i
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        # Timed separately, as tracing slows allocation down.
+        table = LinearProbeTable(expected_size=n, columnar=columnar)
+        insert = timed(lambda: [table.__setitem__(name, i) for i, name in enumerate(names)])
+        overwrite = timed(lambda: [table.__setitem__(name, -i) for i, name in enumerate(names)])
+        scan = timed(table.values)
+        report(
+            label,
+            bytes_per_entry=f"{memory / n:.0f}",
+            inserts_per_s=f"{n / insert:.0f}",
+            overwrites_per_s=f"{n / overwrite:.0f}",
+            values_scan=f"{scan:.3f}s",
+        )
+
+
+@benchmark
+def probe_sequences():
+    """
+    Average and maximum probe lengths of each probe sequence on mountain names, just under the 0.5 load factor.
+    """
+    size = 24593
+    names = mountain_names(size // 2 - 1)
+    present = set(names)
+    missing = [name for name in mountain_names(len(names), seed=1) if name not in present]
+    for probing in (LINEAR, QUADRATIC, DOUBLE):
+        table = LinearProbeTable(sizes=[size], probing=probing)
+        table.update((name, 0) for name in names)
+        hits = [probe_length(table, name) for name in names]
+        misses = [probe_length(table, name) for name in missing]
+        lookups = timed(lambda: [name in table for name in names + missing])
+        report(
+            probing.name,
+            avg_hit=f"{sum(hits) / len(hits):.2f}",
+            max_hit=max(hits),
+            avg_miss=f"{sum(misses) / len(misses):.2f}",
+            max_miss=max(misses),
+            lookups=f"{lookups:.3f}s",
+        )
+
+
+@benchmark
+def small_rows():
+    """
+    DoubleKeyTable memory per row and lookups with rows of 1 to 3 entries, as hash tables against small rows.
+    """
+    n = 20_000
+    names = mountain_names(n)
+    for row_size in (1, 2, 3):
+        pairs = [((name, str(j)), j) for name in names for j in range(row_size)]
+        for label, limit in (("tables", 0), ("small rows", 4)):
+            tracemalloc.start()
+            table = DoubleKeyTable(small_row_limit=limit)
+            table.set_many(pairs)
+            memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            lookups = timed(lambda: table.get_many(key for key, _ in pairs))
+            report(
+                f"{row_size} per row, {label}",
+                bytes_per_row=f"{memory / n:.0f}",
+                lookups_per_s=f"{len(pairs) / lookups:.0f}",
+            )
+
+
+@benchmark
+def snapshot():
+    """
+    Getting a DoubleKeyTable ready to serve lookups: rebuilding it from pairs against reopening a saved snapshot.
+    """
+    names = mountain_names(20_000)
+    pairs = [((difficulty, name), [difficulty]) for difficulty in range(5) for name in names]
+    table = DoubleKeyTable()
+    rebuild = timed(lambda: table.set_many(pairs))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "table.dkt")
+        save = timed(lambda: table.save(path))
+        start = time.perf_counter()
+        with DoubleKeyTable.load(path) as loaded:
+            loaded[3, names[0]]
+            reopen = time.perf_counter() - start
+            in_memory = timed(lambda: [table[key] for key, _ in pairs[:20_000]])
+            mapped = timed(lambda: [loaded[key] for key, _ in pairs[:20_000]])
+        size = os.path.getsize(path)
+    report("rebuild", seconds=f"{rebuild:.3f}")
+    report("save", seconds=f"{save:.3f}", file_bytes=size)
+    report("reopen + first lookup", seconds=f"{reopen:.5f}")
+    report("20000 lookups", in_memory=f"{in_memory:.3f}s", mapped=f"{mapped:.3f}s")
+
+
+@benchmark
+def alphabets():
+    """
+    InfiniteHashTable lookup depth, memory and lookups for each alphabet, on mixed-case mountain names and 6 character codes.
+    """
+    rng = random.Random(0)
+    characters = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+    codes = list({"".join(rng.choice(characters) for _ in range(6)) for _ in range(20_000)})
+    for data, keys in (("names", mountain_names(20_000)), ("codes", codes)):
+        for alphabet in (LOWERCASE, PRINTABLE, BYTE):
+            tracemalloc.start()
+            table = InfiniteHashTable(alphabet)
+            for i, key in enumerate(keys):
+                table[key] = i
+            memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            depths = [len(table.get_location(key)) for key in keys]
+            lookups = timed(lambda: [table[key] for key in keys])
+            report(
+                f"{data}, {alphabet.name}",
+                avg_depth=f"{sum(depths) / len(depths):.2f}",
+                max_depth=max(depths),
+                tables=table.stats()["table_count"],
+                bytes_per_key=f"{memory / len(keys):.0f}",
+                lookups=f"{lookups:.3f}s",
+            )
+
+
+@benchmark
+def sparse_nodes():
+    """
+    InfiniteHashTable bytes per key on mountain names and lowercase words, with full tables against sparse nodes, with and without path compression.
+    """
+    rng = random.Random(0)
+    words = list({"".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 12))) for _ in range(20_000)})
+    for data, keys in (("names", mountain_names(20_000)), ("words", words)):
+        for label, compress, sparse_limit in (("full", False, 0), ("sparse 4", False, 4), ("sparse 8", False, 8), ("compressed", True, 0), ("both, sparse 4", True, 4)):
+            tracemalloc.start()
+            table = InfiniteHashTable(compress=compress, sparse_limit=sparse_limit)
+            for i, key in enumerate(keys):
+                table[key] = i
+            memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            lookups = timed(lambda: [table[key] for key in keys])
+            report(
+                f"{data}, {label}",
+                tables=table.stats()["table_count"],
+                bytes_per_key=f"{memory / len(keys):.0f}",
+                lookups=f"{lookups:.3f}s",
+            )
+
+
+if __name__ == "__main__":
+
+    p = argparse.ArgumentParser()
+    p.add_argument(
+        "benchmark",
+        help="The benchmark to run. Leave blank for all benchmarks.",
+        choices=sorted(BENCHMARKS),
+        default=None,
+        nargs="?",
+    )
+    args = p.parse_args()
+
+    for name, func in BENCHMARKS.items():
+        if args.benchmark in (None, name):
+            print(f"{name}: {func.__doc__.strip()}")
+            func()
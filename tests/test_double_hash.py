@@ -1,7 +1,11 @@
+import os
+import tempfile
 import unittest
+from unittest.mock import patch
 from ed_utils.decorators import number
 
-from double_key_table import DoubleKeyTable
+from double_key_table import DoubleKeyTable, InternalTable, SmallRow
+from data_structures.growth_policy import GrowthPolicy
 
 class TestDoubleHash(unittest.TestCase):
 
@@ -135,4 +139,269 @@ class TestDoubleHash(unittest.TestCase):
         # We just want to make sure you aren't returning a list and are doing this
         # with an iterator.
         self.assertRaises(BaseException, lambda: next(key_iterator))
-        self.assertRaises(BaseException, lambda: next(value_iterator))
\ No newline at end of file
+        self.assertRaises(BaseException, lambda: next(value_iterator))
+
+    @number("3.6")
+    def test_growth_policy(self):
+        internal_policy = GrowthPolicy([3], growth_factor=2)
+        dt = DoubleKeyTable(policy=GrowthPolicy([3]), internal_policy=internal_policy)
+        for i in range(50):
+            dt["Row" + str(i % 10), "Col" + str(i)] = i
+        self.assertEqual(len(dt), 10)
+        self.assertGreater(dt.table_size, 20)
+        # Every internal table grew past 3 through the shared policy.
+        self.assertEqual(set(dt.keys("Row3")), {"Col" + str(i) for i in range(3, 50, 10)})
+        self.assertEqual(dt["Row7", "Col47"], 47)
+        self.assertGreater(len(internal_policy.sizes), 1)
+
+        dt = DoubleKeyTable(internal_policy=GrowthPolicy([5], max_load_factor=0.8))
+        for i in range(20):
+            dt["Row" + str(i % 2), "Col" + str(i)] = i
+        self.assertEqual(dt["Row1", "Col19"], 19)
+        self.assertEqual(dt.total_len(), 20)
+
+    @number("3.7")
+    def test_stats(self):
+        dt = DoubleKeyTable(sizes=[5, 13], internal_sizes=[5], stats=True)
+        dt["May", "Jim"] = 1
+        dt["Kim", "Tim"] = 2
+        dt["May", "Tim"] = 3
+        self.assertEqual(dt["May", "Tim"], 3)
+        stats = dt.stats()
+        self.assertEqual(stats["load_factor"], 2 / 5)
+        self.assertEqual(sum(stats["probe_histogram"].values()), 4)
+        self.assertEqual(stats["rehash_count"], 0)
+        self.assertEqual(stats["internal"]["load_factor"], 3 / 10)
+        self.assertEqual(sum(stats["internal"]["probe_histogram"].values()), 4)
+
+        dt["Tom", "Tim"] = 4
+        self.assertEqual(dt.table_size, 13)
+        self.assertEqual(dt.stats()["rehash_count"], 1)
+
+        # Nothing is recorded without stats.
+        dt = DoubleKeyTable()
+        dt["May", "Jim"] = 1
+        self.assertEqual(set(dt.stats()), {"load_factor", "longest_cluster", "internal"})
+        with patch("double_key_table.time.perf_counter", side_effect=AssertionError):
+            for i in range(20):
+                dt["Row" + str(i), "Jim"] = i
+        self.assertGreater(dt.table_size, 13)
+
+    @number("3.8")
+    def test_keyed_iteration(self):
+        class TestingDKT(DoubleKeyTable):
+            def hash1(self, k):
+                return ord(k[0]) % 12
+
+        dt = TestingDKT(sizes=[12], stats=True)
+        dt["May", "Jim"] = 1
+        dt["Mel", "Tim"] = 2 # Probes past May
+        dt["May", "Tom"] = 3
+        dt["Amy", "Ben"] = 4
+        probes = sum(dt.stats()["probe_histogram"].values())
+
+        self.assertEqual(set(dt.iter_items("May")), {("Jim", 1), ("Tom", 3)})
+        self.assertEqual(set(dt.keys("Mel")), {"Tim"})
+        self.assertEqual(set(dt.values("May")), {1, 3})
+        self.assertEqual(list(dt.iter_items("Kim")), [])
+        # One outer probe for each row listed, rather than a full scan.
+        self.assertEqual(sum(dt.stats()["probe_histogram"].values()), probes + 4)
+
+        self.assertEqual(set(dt.iter_items()), {(("May", "Jim"), 1), (("Mel", "Tim"), 2), (("May", "Tom"), 3), (("Amy", "Ben"), 4)})
+        self.assertEqual(set(dt.keys()), {"May", "Mel", "Amy"})
+        self.assertEqual(sorted(dt.values()), [1, 2, 3, 4])
+
+    @number("3.9")
+    def test_rehash_moves_rows(self):
+        class CountingDKT(DoubleKeyTable):
+            hash2_calls = 0
+            def hash2(self, k, sub_table):
+                CountingDKT.hash2_calls += 1
+                return super().hash2(k, sub_table)
+
+        dt = CountingDKT(sizes=[5, 13, 29])
+        dt["May", "Jim"] = 1
+        dt["May", "Tim"] = 2
+        may_row = dt._row("May")
+        dt["Kim", "Tim"] = 3
+        calls = CountingDKT.hash2_calls
+        dt["Amy", "Ben"] = 4 # 3 rows >= 5 / 2, so the top-level table grows
+        self.assertEqual(dt.table_size, 13)
+        # Only the new pair is hashed, and rows are moved as they are.
+        self.assertEqual(CountingDKT.hash2_calls, calls + 1)
+        self.assertIs(dt._row("May"), may_row)
+        self.assertEqual(len(dt), 3)
+        self.assertEqual(dt["May", "Jim"], 1)
+        self.assertEqual(dt["May", "Tim"], 2)
+        self.assertEqual(dt["Kim", "Tim"], 3)
+        self.assertEqual(dt["Amy", "Ben"], 4)
+
+    @number("3.10")
+    def test_counts(self):
+        dt = DoubleKeyTable()
+        dt["May", "Jim"] = 1
+        dt["May", "Tim"] = 2
+        dt["Kim", "Tim"] = 3
+        dt["May", "Tim"] = 4 # Overwrite
+        self.assertEqual(len(dt), 2)
+        self.assertEqual(dt.total_len(), 3)
+        self.assertEqual(dt.row_len("May"), 2)
+        self.assertEqual(dt.row_len("Kim"), 1)
+        self.assertRaises(KeyError, lambda: dt.row_len("Amy"))
+
+        del dt["Kim", "Tim"]
+        self.assertRaises(KeyError, lambda: dt.row_len("Kim"))
+        self.assertRaises(KeyError, lambda: dt.__delitem__(("May", "Bob")))
+        del dt["May", "Jim"]
+        self.assertEqual(len(dt), 1)
+        self.assertEqual(dt.total_len(), 1)
+        self.assertEqual(dt.row_len("May"), 1)
+
+    @number("3.11")
+    def test_delete_row_in_cluster(self):
+        class TestingDKT(DoubleKeyTable):
+            def hash1(self, k):
+                return ord(k[0]) % 12
+
+        dt = TestingDKT(sizes=[12])
+        dt["May", "Jim"] = 1 # 5
+        dt["Mel", "Tim"] = 2 # 5, probes to 6
+        dt["Ned", "Bob"] = 3 # 6, probes to 7
+        dt["Kim", "Tom"] = 4 # 3
+        del dt["May", "Jim"]
+        # The rest of the cluster moves back and stays reachable.
+        self.assertEqual(dt._outer_probe("Mel", False), 5)
+        self.assertEqual(dt._outer_probe("Ned", False), 6)
+        self.assertIsNone(dt.array[7])
+        self.assertEqual(dt["Mel", "Tim"], 2)
+        self.assertEqual(dt["Ned", "Bob"], 3)
+        self.assertEqual(dt["Kim", "Tom"], 4)
+
+        del dt["Mel", "Tim"]
+        self.assertEqual(dt._outer_probe("Ned", False), 6)
+        self.assertEqual(dt["Ned", "Bob"], 3)
+        self.assertEqual(len(dt), 2)
+
+    @number("3.12")
+    def test_shared_hash_strategy(self):
+        dt = DoubleKeyTable()
+        dt["May", "Jim"] = 1
+        dt["Kim", "Tim"] = 2
+        may_row = dt._row("May")
+        kim_row = dt._row("Kim")
+        self.assertIsInstance(may_row, InternalTable)
+        self.assertIs(may_row.strategy, dt)
+        self.assertIs(kim_row.strategy, dt)
+        # No per-row closure, nor any instance dict.
+        self.assertEqual(vars(may_row), {})
+        self.assertEqual(may_row.hash("Jim"), dt.hash2("Jim", may_row))
+
+    @number("3.13")
+    def test_get_set_many(self):
+        dt = DoubleKeyTable(stats=True)
+        dt.set_many([(("May", "Jim"), 1), (("Kim", "Tim"), 2), (("May", "Tom"), 3), (("May", "Jim"), 4)])
+        self.assertEqual(dt.total_len(), 3)
+        self.assertEqual(dt["May", "Jim"], 4)
+        # One outer probe per row.
+        self.assertEqual(sum(dt.stats()["probe_histogram"].values()), 2 + 1)
+
+        self.assertEqual(dt.get_many([("May", "Tom"), ("Kim", "Tim"), ("May", "Jim")]), [3, 2, 4])
+        self.assertEqual(sum(dt.stats()["probe_histogram"].values()), 3 + 2)
+        self.assertRaises(KeyError, lambda: dt.get_many([("May", "Tom"), ("May", "Bob")]))
+        self.assertRaises(KeyError, lambda: dt.get_many([("Amy", "Tom")]))
+
+        dt.set_many(((str(i), "Jim"), i) for i in range(100))
+        self.assertEqual(len(dt), 102)
+        self.assertEqual(dt.get_many([(str(i), "Jim") for i in range(100)]), list(range(100)))
+
+    @number("3.14")
+    def test_int_keys(self):
+        dt = DoubleKeyTable()
+        for difficulty in range(60):
+            dt[difficulty, "Peak"] = difficulty
+            dt[difficulty, (difficulty, 1)] = -difficulty
+        self.assertGreater(dt.table_size, 60)
+        self.assertEqual(dt[42, "Peak"], 42)
+        self.assertEqual(dt[42, (42, 1)], -42)
+        self.assertEqual(dt.row_len(42), 2)
+        self.assertRaises(KeyError, lambda: dt[60, "Peak"])
+
+    @number("3.15")
+    def test_reverse_index(self):
+        for reverse_index in (True, False):
+            dt = DoubleKeyTable(reverse_index=reverse_index)
+            dt["May", "Jim"] = 1
+            dt["Kim", "Jim"] = 2
+            dt["May", "Tim"] = 3
+            dt.set_many([(("Amy", "Jim"), 4), (("May", "Jim"), 5)])
+            self.assertEqual(set(dt.iter_keys_by_second("Jim")), {"May", "Kim", "Amy"})
+            self.assertEqual(sorted(dt.iter_values_by_second("Jim")), [2, 4, 5])
+            self.assertEqual(list(dt.iter_keys_by_second("Bob")), [])
+
+            del dt["Kim", "Jim"]
+            del dt["May", "Tim"]
+            self.assertEqual(set(dt.iter_keys_by_second("Jim")), {"May", "Amy"})
+            self.assertEqual(list(dt.iter_keys_by_second("Tim")), [])
+            if reverse_index:
+                self.assertNotIn("Tim", dt._reverse_index)
+
+            # Rehashing moves rows, and leaves the index as it is.
+            for i in range(20):
+                dt[str(i), "Jim"] = i
+            self.assertEqual(set(dt.iter_keys_by_second("Jim")), {"May", "Amy"} | {str(i) for i in range(20)})
+
+    @number("3.16")
+    def test_small_rows(self):
+        dt = DoubleKeyTable(small_row_limit=2)
+        dt["May", "Jim"] = 1
+        dt["May", "Tim"] = 2
+        self.assertIsInstance(dt._row("May"), SmallRow)
+        self.assertEqual(dt._linear_probe("May", "Tim", False)[1], 1)
+        dt["May", "Jim"] = 3
+        self.assertEqual(dt["May", "Jim"], 3)
+        self.assertEqual(dt.row_len("May"), 2)
+
+        # Promoted once it passes the limit.
+        dt["May", "Tom"] = 4
+        self.assertIsInstance(dt._row("May"), InternalTable)
+        self.assertEqual(set(dt.iter_items("May")), {("Jim", 3), ("Tim", 2), ("Tom", 4)})
+
+        dt["Kim", "Jim"] = 5
+        dt["Kim", "Tim"] = 6
+        del dt["Kim", "Jim"]
+        self.assertEqual(list(dt.iter_items("Kim")), [("Tim", 6)])
+        self.assertRaises(KeyError, lambda: dt["Kim", "Jim"])
+        del dt["Kim", "Tim"]
+        self.assertNotIn("Kim", dt.keys())
+        self.assertEqual(dt.total_len(), 3)
+
+    @number("3.17")
+    def test_save_load(self):
+        dt = DoubleKeyTable(small_row_limit=1)
+        dt["May", "Jim"] = 1
+        dt["May", "Tim"] = [2, 3]
+        dt["Kim", "Tim"] = "4"
+        dt[5, (6, "Amy")] = None
+        for i in range(50):
+            dt[str(i), "Bob"] = i
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "table.dkt")
+            dt.save(path)
+            with DoubleKeyTable.load(path) as loaded:
+                self.assertEqual(len(loaded), len(dt))
+                self.assertEqual(loaded.total_len(), 54)
+                self.assertEqual(loaded["May", "Tim"], [2, 3])
+                self.assertEqual(loaded["Kim", "Tim"], "4")
+                self.assertIsNone(loaded[5, (6, "Amy")])
+                self.assertEqual(loaded["42", "Bob"], 42)
+                self.assertEqual(loaded.row_len("May"), 2)
+                self.assertNotIn(("May", "Bob"), loaded)
+                self.assertNotIn(("Amy", "Bob"), loaded)
+                self.assertEqual(set(loaded.keys("May")), {"Jim", "Tim"})
+                self.assertEqual(set(loaded.keys()), set(dt.keys()))
+                self.assertEqual(sorted(map(str, loaded.iter_items())), sorted(map(str, dt.iter_items())))
+
+            with open(path, "wb") as file:
+                file.write(b"not a snapshot at all")
+            self.assertRaises(ValueError, lambda: DoubleKeyTable.load(path))
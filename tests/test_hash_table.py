@@ -0,0 +1,294 @@
+import unittest
+from unittest.mock import patch
+from ed_utils.decorators import number
+
+from data_structures.hash_table import LinearProbeTable, TOMBSTONE
+from data_structures.growth_policy import GrowthPolicy, is_prime
+from data_structures.probing import QUADRATIC, DOUBLE
+
+class TestLinearProbeTable(unittest.TestCase):
+
+    @number("8.1")
+    def test_rehash_reuses_hashes(self):
+        class CountingLPT(LinearProbeTable):
+            calls = 0
+            def full_hash(self, key):
+                CountingLPT.calls += 1
+                return super().full_hash(key)
+
+        lpt = CountingLPT()
+        names = ["Everest", "K2", "Kangchenjunga", "Lhotse", "Makalu", "Cho Oyu", "Dhaulagiri"]
+        for i, name in enumerate(names):
+            lpt[name] = i
+        # Only the inserts hash, the rehashes along the way do not.
+        self.assertEqual(CountingLPT.calls, len(names))
+        self.assertGreater(lpt.table_size, 5)
+        for i, name in enumerate(names):
+            self.assertEqual(lpt[name], i)
+            self.assertEqual(lpt.hash(name), lpt.full_hash(name) % lpt.table_size)
+
+        del lpt["K2"]
+        self.assertNotIn("K2", lpt)
+        self.assertEqual(set(lpt.keys()), set(names) - {"K2"})
+
+    @number("8.2")
+    def test_robin_hood(self):
+        class TestingLPT(LinearProbeTable):
+            def hash(self, k):
+                return ord(k[0]) % self.table_size
+
+        lpt = TestingLPT(sizes=[13], robin_hood=True)
+        lpt["Amy"] = 1 # 65 % 13 = 0
+        lpt["Nat"] = 2 # 78 % 13 = 0
+        lpt["Bob"] = 3 # 66 % 13 = 1
+        lpt["Ann"] = 4 # 0, displaces Bob
+        self.assertEqual(lpt._linear_probe("Amy", False), 0)
+        self.assertEqual(lpt._linear_probe("Nat", False), 1)
+        self.assertEqual(lpt._linear_probe("Ann", False), 2)
+        self.assertEqual(lpt._linear_probe("Bob", False), 3)
+        # Misses stop at Bob, rather than running to the end of the cluster.
+        # An insert returns Bob's position, still taken until _insert shifts him along.
+        self.assertEqual(lpt._linear_probe("Ada", True), 3)
+        self.assertEqual(lpt._key_at(3), "Bob")
+        lpt._insert("Ada", 5)
+        self.assertEqual(lpt._linear_probe("Ada", False), 3)
+        self.assertEqual(lpt._linear_probe("Bob", False), 4)
+        del lpt["Ada"]
+        self.assertRaises(KeyError, lambda: lpt._linear_probe("Ada", False))
+
+        del lpt["Nat"]
+        self.assertEqual(lpt._linear_probe("Ann", False), 1)
+        self.assertEqual(lpt._linear_probe("Bob", False), 2)
+        self.assertEqual(len(lpt), 3)
+        self.assertEqual(set(lpt.values()), {1, 3, 4})
+
+    @number("8.3")
+    def test_tombstones(self):
+        class TestingLPT(LinearProbeTable):
+            def hash(self, k):
+                return ord(k[0]) % self.table_size
+
+        lpt = TestingLPT(sizes=[13], tombstones=True, compaction_threshold=0.2)
+        lpt["Amy"] = 1 # 0
+        lpt["Ann"] = 2 # 0
+        lpt["Ava"] = 3 # 0
+        del lpt["Ann"]
+        # The rest of the cluster stays where it is.
+        self.assertIs(lpt.hashes[1], TOMBSTONE)
+        self.assertEqual(lpt._linear_probe("Ava", False), 2)
+        self.assertEqual(lpt.keys(), ["Amy", "Ava"])
+        self.assertEqual(lpt.values(), [1, 3])
+        # Inserts reuse the tombstone, but only once the key is known to be new.
+        self.assertEqual(lpt._linear_probe("Ava", True), 2)
+        self.assertEqual(lpt._linear_probe("Abe", True), 1)
+        lpt["Abe"] = 4
+        self.assertEqual(lpt.tombstone_count, 0)
+
+        lpt["Bob"] = 5 # 1, probes to 3
+        del lpt["Amy"]
+        del lpt["Abe"]
+        self.assertEqual(lpt.tombstone_count, 2)
+        # 3 tombstones > 0.2 * 13, so the table is compacted.
+        del lpt["Ava"]
+        self.assertEqual(lpt.tombstone_count, 0)
+        self.assertEqual(lpt._linear_probe("Bob", False), 1)
+        self.assertEqual(len(lpt), 1)
+
+    @number("8.4")
+    def test_presized_and_update(self):
+        class CountingLPT(LinearProbeTable):
+            def _resize(self, size):
+                self.resizes += 1
+                super()._resize(size)
+
+        lpt = CountingLPT(expected_size=40)
+        lpt.resizes = 0
+        self.assertEqual(lpt.table_size, 97)
+        for i in range(40):
+            lpt[str(i)] = i
+        self.assertEqual(lpt.resizes, 0)
+
+        lpt.update((str(i), -i) for i in range(30, 1000))
+        # One resize straight to the first size over 2 * 1000.
+        self.assertEqual(lpt.resizes, 1)
+        self.assertEqual(lpt.table_size, 3079)
+        self.assertEqual(len(lpt), 1000)
+        self.assertEqual(lpt["29"], 29)
+        self.assertEqual(lpt["30"], -30)
+        self.assertEqual(lpt["999"], -999)
+
+    @number("8.5")
+    def test_growth_policy(self):
+        policy = GrowthPolicy([5, 13], growth_factor=3, max_load_factor=0.25)
+        lpt = LinearProbeTable(policy=policy)
+        for i in range(100):
+            lpt[str(i)] = i
+        # Kept growing past the given sizes.
+        self.assertGreaterEqual(lpt.table_size, 400)
+        self.assertTrue(is_prime(lpt.table_size))
+        self.assertEqual(policy.sizes[:3], [5, 13, 41])
+        self.assertTrue(all(is_prime(size) for size in policy.sizes))
+        self.assertEqual(len(lpt), 100)
+        self.assertEqual(lpt["99"], 99)
+
+        # Given sizes still bound the growth.
+        lpt = LinearProbeTable(sizes=[5, 13])
+        for i in range(10):
+            lpt[str(i)] = i
+        self.assertEqual(lpt.table_size, 13)
+        self.assertEqual(lpt.size_index, 1)
+
+        # Without tombstones there is nothing to compact, so high loads are allowed.
+        for robin_hood in (False, True):
+            lpt = LinearProbeTable(policy=GrowthPolicy([5], max_load_factor=0.8), robin_hood=robin_hood)
+            for i in range(20):
+                lpt[str(i)] = i
+            self.assertEqual(lpt["19"], 19)
+        self.assertRaises(ValueError, lambda: LinearProbeTable(tombstones=True, policy=GrowthPolicy([5], max_load_factor=0.8)))
+
+    @number("8.6")
+    def test_incremental_rehash(self):
+        lpt = LinearProbeTable(sizes=[5, 13, 29], incremental=True, migration_step=1)
+        lpt["Amy"] = 1
+        lpt["Ben"] = 2
+        lpt["Cat"] = 3
+        # 3 > 5 / 2, so migration to 13 has started.
+        self.assertEqual(lpt.table_size, 13)
+        self.assertIsNotNone(lpt._retired)
+        self.assertEqual(len(lpt), 3)
+
+        # Old and new arrays are both searched.
+        self.assertEqual(lpt["Amy"], 1)
+        self.assertEqual(lpt["Ben"], 2)
+        lpt["Cat"] = 4
+        del lpt["Ben"]
+        self.assertNotIn("Ben", lpt)
+        self.assertEqual(len(lpt), 2)
+
+        for _ in range(5):
+            self.assertEqual(lpt["Cat"], 4)
+        # Every old slot has been migrated by now.
+        self.assertIsNone(lpt._retired)
+        self.assertEqual(sorted(lpt.values()), [1, 4])
+
+        # Iterating finishes any migration first, so entries stay put.
+        for i, name in enumerate(["Dan", "Eve", "Fay", "Gus", "Hal"]):
+            lpt[name] = i
+        # 7 > 13 / 2, so migration to 29 has started.
+        self.assertIsNotNone(lpt._retired)
+        self.assertEqual(set(lpt.keys()), {"Amy", "Cat", "Dan", "Eve", "Fay", "Gus", "Hal"})
+        self.assertIsNone(lpt._retired)
+
+    @number("8.7")
+    def test_columnar(self):
+        lpt = LinearProbeTable(columnar=True)
+        self.assertFalse(hasattr(lpt, "array"))
+        for i in range(20):
+            lpt["Peak" + str(i)] = i
+        lpt["Peak3"] = 30
+        position = lpt._linear_probe("Peak3", False)
+        self.assertEqual(lpt.key_array[position], "Peak3")
+        self.assertEqual(lpt.value_array[position], 30)
+        self.assertEqual(lpt.hashes[position], lpt.full_hash("Peak3"))
+
+        del lpt["Peak4"]
+        self.assertEqual(len(lpt), 19)
+        self.assertEqual(set(lpt.keys()), {"Peak" + str(i) for i in range(20)} - {"Peak4"})
+        self.assertEqual(sorted(lpt.values()), sorted([30] + [i for i in range(20) if i not in (3, 4)]))
+
+    @number("8.8")
+    def test_iterators(self):
+        lpt = LinearProbeTable()
+        lpt["May"] = 1
+        lpt["Kim"] = 2
+        self.assertEqual(set(lpt.iter_items()), {("May", 1), ("Kim", 2)})
+        self.assertEqual(set(lpt), {"May", "Kim"})
+
+        value_iterator = lpt.iter_values()
+        self.assertIn(next(value_iterator), [1, 2])
+        # Overwriting is fine.
+        lpt["May"] = 3
+        lpt["Kim"] = 4
+        self.assertIn(next(value_iterator), [3, 4])
+
+        key_iterator = iter(lpt)
+        next(key_iterator)
+        del lpt["May"]
+        self.assertRaises(RuntimeError, lambda: next(key_iterator))
+
+    @number("8.9")
+    def test_probe_sequences(self):
+        class TestingLPT(LinearProbeTable):
+            def hash(self, k):
+                return ord(k[0]) % self.table_size
+
+        lpt = TestingLPT(sizes=[13], probing=QUADRATIC)
+        self.assertTrue(lpt.tombstones)
+        for i, name in enumerate(["Amy", "Ann", "Ava", "Abe"]):
+            lpt[name] = i
+        # Offsets 0, 1, 3, 6 from the initial position.
+        self.assertEqual([lpt._linear_probe(name, False) for name in ["Amy", "Ann", "Ava", "Abe"]], [0, 1, 3, 6])
+        del lpt["Ann"]
+        self.assertEqual(lpt._linear_probe("Abe", False), 6)
+
+        lpt = LinearProbeTable(probing=DOUBLE)
+        for i in range(200):
+            lpt["Peak" + str(i)] = i
+        self.assertEqual(sorted(lpt.values()), list(range(200)))
+        self.assertEqual(DOUBLE.steps(5 * 13 + 2, 13), (6, 0))
+
+        self.assertRaises(ValueError, lambda: LinearProbeTable(probing=DOUBLE, robin_hood=True))
+        self.assertRaises(ValueError, lambda: LinearProbeTable(probing=QUADRATIC, policy=GrowthPolicy([5], max_load_factor=0.7)))
+
+    @number("8.10")
+    def test_stats(self):
+        class TestingLPT(LinearProbeTable):
+            def hash(self, k):
+                return ord(k[0]) % self.table_size
+
+        lpt = TestingLPT(sizes=[13, 29], stats=True)
+        lpt["Amy"] = 1 # 0
+        lpt["Ann"] = 2 # 0, probes 2 slots
+        lpt["Bob"] = 3 # 1, probes 2 slots
+        self.assertEqual(lpt["Bob"], 3)
+        stats = lpt.stats()
+        self.assertEqual(stats["probe_histogram"], {1: 1, 2: 3})
+        self.assertEqual(stats["longest_cluster"], 3)
+        self.assertEqual(stats["load_factor"], 3 / 13)
+        self.assertEqual(stats["rehash_count"], 0)
+
+        for name in ["Cal", "Dee", "Eve", "Fay"]:
+            lpt[name] = 0
+        self.assertEqual(lpt.table_size, 29)
+        self.assertEqual(lpt.stats()["rehash_count"], 1)
+        self.assertGreaterEqual(lpt.stats()["rehash_time"], 0)
+
+        # Nothing is recorded without stats.
+        lpt = LinearProbeTable()
+        lpt["Amy"] = 1
+        self.assertIsNone(lpt._stats)
+        self.assertEqual(set(lpt.stats()), {"load_factor", "longest_cluster"})
+
+        # Nor is the clock read, while resizing or migrating.
+        with patch("data_structures.hash_table.time.perf_counter", side_effect=AssertionError):
+            for incremental in (False, True):
+                lpt = LinearProbeTable(incremental=incremental)
+                for i in range(50):
+                    lpt[str(i)] = i
+                self.assertEqual(lpt["49"], 49)
+
+    @number("8.11")
+    def test_int_and_tuple_keys(self):
+        lpt = LinearProbeTable()
+        for i in range(200):
+            lpt[i] = str(i)
+            lpt[(i, "Peak")] = i
+        self.assertEqual(len(lpt), 400)
+        self.assertEqual(lpt[150], "150")
+        self.assertEqual(lpt[(150, "Peak")], 150)
+        self.assertNotIn((150, "Hill"), lpt)
+        lpt[-150] = "-150"
+        self.assertEqual(lpt[-150], "-150")
+        # Consecutive integers are scattered, rather than filling one run of slots.
+        self.assertLess(lpt.stats()["longest_cluster"], 50)
+        self.assertNotEqual(lpt.full_hash((1, 2)), lpt.full_hash((2, 1)))
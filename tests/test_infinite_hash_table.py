@@ -1,7 +1,11 @@
 import unittest
+from unittest.mock import patch
 from ed_utils.decorators import number
 
 from infinite_hash_table import InfiniteHashTable
+from data_structures.alphabet import MappedAlphabet, PRINTABLE, BYTE
+from data_structures.referential_array import ArrayR
+from data_structures.sparse_array import SparseArray
 
 class TestInfiniteHash(unittest.TestCase):
 
@@ -91,3 +95,189 @@ class TestInfiniteHash(unittest.TestCase):
             "mining"
         ]
         self.assertListEqual(res, expected)
+
+    @number("4.4")
+    def test_stats(self):
+        ih = InfiniteHashTable()
+        ih["lin"] = 1
+        ih["leg"] = 2
+        ih["mine"] = 3
+        stats = ih.stats()
+        self.assertEqual(stats["depth_histogram"], {1: 1, 2: 2})
+        self.assertEqual(stats["table_count"], 2)
+        self.assertAlmostEqual(stats["load_factor"], 4 / 54)
+
+    @number("4.5")
+    def test_iter_sorted(self):
+        ih = InfiniteHashTable()
+        words = ["lin", "leg", "mine", "linked", "limp", "mining", "jake", "linger", "a", "zebra", "hat", "l"]
+        for i, word in enumerate(words):
+            ih[word] = i
+        self.assertEqual(list(ih.iter_sorted()), sorted(words))
+        self.assertEqual(ih.sort_keys(), sorted(words))
+
+        # Lowercase keys are streamed without comparing any.
+        with patch("infinite_hash_table.mergesort", side_effect=AssertionError):
+            self.assertEqual(list(ih.iter_sorted()), sorted(words))
+
+        # Keys the alphabet cannot order are still sorted.
+        ih["Lin"] = 0
+        ih["lIn"] = 0
+        self.assertEqual(ih.unordered, 2)
+        self.assertEqual(list(ih.iter_sorted()), sorted(words + ["Lin", "lIn"]))
+        self.assertEqual(ih.sort_keys(), sorted(words + ["Lin", "lIn"]))
+        del ih["Lin"]
+        del ih["lIn"]
+        self.assertEqual(ih.unordered, 0)
+
+        # A space shares the slot of "n".
+        names = ["Mount Cook", "Matterhorn", "Mount Rosa", "Mountbatten"]
+        for ih in (InfiniteHashTable(), InfiniteHashTable(compress=True, sparse_limit=3)):
+            for i, name in enumerate(names):
+                ih[name] = i
+            self.assertEqual(list(ih.iter_sorted()), sorted(names))
+
+    @number("4.6")
+    def test_alphabets(self):
+        names = ["Mont Blanc", "mont blanc", "Mont-Blanc", "Monte Rosa", "K2", "k2"]
+        for alphabet in (PRINTABLE, BYTE):
+            ih = InfiniteHashTable(alphabet)
+            self.assertEqual(ih.TABLE_SIZE, alphabet.size + 1)
+            for i, name in enumerate(names):
+                ih[name] = i
+            for i, name in enumerate(names):
+                self.assertEqual(ih[name], i)
+            self.assertEqual(list(ih.iter_sorted()), sorted(names))
+            self.assertEqual(ih.get_location("K2"), [ord("K") - alphabet.first])
+            del ih["k2"]
+            self.assertNotIn("k2", ih)
+
+        vowels = MappedAlphabet("vowels", {"a": 0, "e": 1, "i": 2, "o": 3, "u": 3})
+        ih = InfiniteHashTable(vowels)
+        self.assertEqual(ih.TABLE_SIZE, 5)
+        ih["aei"] = 1
+        ih["aou"] = 2
+        ih["ea"] = 3
+        self.assertEqual(ih.get_location("aou"), [0, 3])
+        self.assertEqual(ih.sort_keys(), ["aei", "aou", "ea"])
+        # "o" and "u" share a slot, so keys with them are sorted by comparing.
+        self.assertEqual(ih.unordered, 1)
+        self.assertTrue(PRINTABLE.orders("M"))
+        self.assertFalse(PRINTABLE.orders("\n"))
+        self.assertRaises(ValueError, lambda: ih.__setitem__("abc", 4))
+        # Rejected before "aei" is moved to make room for it.
+        self.assertRaises(ValueError, lambda: ih.__setitem__("ax", 4))
+        self.assertEqual(ih.sort_keys(), ["aei", "aou", "ea"])
+        # Keys with characters outside the alphabet are just missing.
+        self.assertNotIn("abc", ih)
+        self.assertNotIn("ax", ih)
+        self.assertRaises(KeyError, lambda: ih["abc"])
+        self.assertRaises(KeyError, lambda: ih.get_location("ax"))
+        self.assertRaises(KeyError, lambda: ih.__delitem__("x"))
+        self.assertEqual(list(ih.keys_with_prefix("x")), [])
+        self.assertEqual(list(ih.keys_with_prefix("aox")), [])
+        self.assertEqual(ih.count_with_prefix("ax"), 0)
+        self.assertEqual(MappedAlphabet.from_characters("ab", "abba").slots, {"a": 0, "b": 1})
+
+    @number("4.7")
+    def test_path_compression(self):
+        ih = InfiniteHashTable(compress=True)
+        ih["lin"] = 1
+        ih["linked"] = 2
+        # One nested table, skipping i and n.
+        self.assertEqual(ih.stats()["table_count"], 2)
+        self.assertEqual(ih.get_location("lin"), [4, 1, 6, 26])
+        self.assertEqual(ih.get_location("linked"), [4, 1, 6, 3])
+
+        ih["leg"] = 2 # Leaves the skip at i, so a table goes in between
+        ih["linked"] = 4 # Overwrite
+        self.assertEqual(len(ih), 3)
+        self.assertEqual(ih.stats()["table_count"], 3)
+        self.assertEqual(ih.get_location("leg"), [4, 23])
+        self.assertEqual(ih.get_location("linked"), [4, 1, 6, 3])
+        self.assertEqual(ih["linked"], 4)
+        self.assertRaises(KeyError, lambda: ih["lint"])
+        self.assertRaises(KeyError, lambda: ih["li"])
+
+        del ih["leg"]
+        # Merged back into a single skip.
+        self.assertEqual(ih.stats()["table_count"], 2)
+        self.assertEqual(ih.get_location("lin"), [4, 1, 6, 26])
+        del ih["linked"]
+        self.assertEqual(ih.get_location("lin"), [4])
+
+        prefix = "x" * 40
+        ih[prefix + "a"] = 1
+        ih[prefix + "b"] = 2
+        self.assertEqual(ih.stats()["table_count"], 2)
+        self.assertEqual(len(ih.get_location(prefix + "b")), 41)
+        self.assertEqual(ih.sort_keys(), ["lin", prefix + "a", prefix + "b"])
+
+    @number("4.8")
+    def test_sparse_nodes(self):
+        ih = InfiniteHashTable(sparse_limit=2)
+        ih["lin"] = 1
+        ih["leg"] = 2
+        self.assertIsInstance(ih.array, SparseArray)
+        self.assertEqual(ih.get_location("lin"), [4, 1])
+        self.assertEqual(ih.get_location("leg"), [4, 23])
+        ih["mine"] = 3
+        self.assertIsInstance(ih.array, SparseArray)
+        # Past 2 taken slots, the table switches to a full array.
+        ih["jake"] = 4
+        self.assertIsInstance(ih.array, ArrayR)
+        self.assertIsInstance(ih.array[4].array, SparseArray)
+        self.assertEqual([ih[key] for key in ["lin", "leg", "mine", "jake"]], [1, 2, 3, 4])
+        self.assertEqual(ih.sort_keys(), ["jake", "leg", "lin", "mine"])
+
+        del ih["leg"]
+        self.assertEqual(ih.get_location("lin"), [4])
+        self.assertRaises(KeyError, lambda: ih["leg"])
+        self.assertEqual(len(ih), 3)
+
+        array = SparseArray(5)
+        array[3] = "c"
+        array[1] = "a"
+        array[3] = "d"
+        self.assertEqual(list(array), [None, "a", None, "d", None])
+        array[1] = None
+        self.assertEqual(array.taken(), 1)
+        self.assertEqual(list(array.to_array()), [None, None, None, "d", None])
+
+    @number("4.9")
+    def test_prefix_search(self):
+        words = ["lin", "leg", "mine", "linked", "limp", "mining", "jake", "linger", "l"]
+        for ih in (InfiniteHashTable(), InfiniteHashTable(compress=True, sparse_limit=3)):
+            for i, word in enumerate(words):
+                ih[word] = i
+            self.assertEqual(list(ih.keys_with_prefix("lin")), ["lin", "linger", "linked"])
+            self.assertEqual(list(ih.keys_with_prefix("li")), ["limp", "lin", "linger", "linked"])
+            self.assertEqual(list(ih.keys_with_prefix("mini")), ["mining"])
+            self.assertEqual(list(ih.keys_with_prefix("ja")), ["jake"])
+            self.assertEqual(list(ih.keys_with_prefix("jo")), [])
+            self.assertEqual(list(ih.keys_with_prefix("linkedin")), [])
+            self.assertEqual(list(ih.keys_with_prefix("")), sorted(words))
+            self.assertEqual(ih.count_with_prefix("l"), 6)
+            self.assertEqual(ih.count_with_prefix("m"), 2)
+            self.assertEqual(ih.count_with_prefix("x"), 0)
+
+        # "M" is in the same slot as "g", but is not matched.
+        ih = InfiniteHashTable()
+        ih["lega"] = 1
+        ih["leMb"] = 2
+        self.assertEqual(list(ih.keys_with_prefix("leg")), ["lega"])
+        self.assertEqual(ih.count_with_prefix("leg"), 1)
+        self.assertEqual(ih.count_with_prefix("le"), 2)
+
+        # Capitals and spaces share slots with lowercase letters, but keys still come out sorted.
+        names = ["Mount Rosa", "Mountain Peak", "Mount Cook", "Mountbatten", "Matterhorn"]
+        for ih in (InfiniteHashTable(), InfiniteHashTable(compress=True)):
+            for i, name in enumerate(names):
+                ih[name] = i
+            self.assertEqual(list(ih.keys_with_prefix("Mount")), ["Mount Cook", "Mount Rosa", "Mountain Peak", "Mountbatten"])
+            self.assertEqual(list(ih.keys_with_prefix("Mount ")), ["Mount Cook", "Mount Rosa"])
+            # Counting never sorts.
+            with patch("infinite_hash_table.mergesort", side_effect=AssertionError):
+                self.assertEqual(ih.count_with_prefix("Mount"), 4)
+                self.assertEqual(ih.count_with_prefix("Mount "), 2)
+                self.assertEqual(ih.count_with_prefix("Matterhorn"), 1)